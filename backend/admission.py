@@ -0,0 +1,102 @@
+# admission.py
+"""
+Admission control and load shedding for pipeline stages.
+
+Each stage (whole requests, LLM calls, DB queries, embeddings) has a
+concurrency limit and a bounded wait queue. Callers beyond the limit wait in
+the queue until a deadline; if the queue is full or the deadline passes they
+get a `Saturated` error straight away, which the API turns into a fast
+429/503 with Retry-After instead of piling up more work.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Saturated(Exception):
+    """Raised when a stage cannot admit more work."""
+
+    def __init__(self, stage: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{stage} stage saturated: {reason}")
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """Concurrency limit with a bounded, deadline-limited wait queue."""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_wait_seconds: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, round(self.max_wait_seconds))
+
+    def acquire(self) -> None:
+        """Takes a slot, waiting in the queue up to `max_wait_seconds`. Raises Saturated otherwise."""
+        deadline = time.monotonic() + self.max_wait_seconds
+        with self._cond:
+            if self._active < self.concurrency:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise Saturated(self.name, 429, self.retry_after, f"{self._waiting} requests already queued")
+            self._waiting += 1
+            try:
+                while self._active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out += 1
+                        raise Saturated(self.name, 503, self.retry_after,
+                                        f"no slot free within {self.max_wait_seconds:g}s")
+                    self._cond.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": self._waiting,
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+
+def limiter_from_env(name: str, concurrency: int, max_queue: int, max_wait_seconds: float) -> StageLimiter:
+    """Builds a limiter whose defaults can be overridden with ADMISSION_<NAME>_{CONCURRENCY,QUEUE,WAIT_SECONDS}."""
+    prefix = f"ADMISSION_{name.upper()}_"
+    return StageLimiter(
+        name,
+        concurrency=int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+        max_queue=int(os.getenv(prefix + "QUEUE", max_queue)),
+        max_wait_seconds=float(os.getenv(prefix + "WAIT_SECONDS", max_wait_seconds)),
+    )
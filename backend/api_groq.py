@@ -1,7 +1,9 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from typing import Callable
 from pydantic import BaseModel
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 import os
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
@@ -10,8 +12,23 @@ from fastapi.middleware.cors import CORSMiddleware
 # import chromadb  # Disabled for Railway deployment (too heavy)
 # from sentence_transformers import SentenceTransformer  # Disabled for Railway deployment (too heavy)
 import numpy as np
+import hashlib
 import json
 import logging
+import time
+from admission import Saturated, limiter_from_env
+from cache import cache_from_url, make_key, private_data_path
+from data_cube import cube_available, route_to_cube
+from downsample import downsample_frame
+from float_documents import load_float_summaries
+from jobs import JobQueueFull, JobRunner, JobStore
+from live_queries import LiveQueryStore, refresh
+from regions import describe_regions, resolve_regions
+from retrieval import HybridRetriever
+from singleflight import SingleFlight
+from sql_guard import CheckedSQL, InvalidSQL, canonical_key, check_sql
+from standard_levels import STANDARD_LEVELS_TABLE, describe_standard_levels
+from trajectories import fetch_trajectories_in_bbox, fetch_trajectory, resolve_zoom
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -50,6 +67,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- ADMISSION CONTROL ---
+# Per-stage concurrency limits with bounded wait queues; saturated stages shed load with 429/503.
+limiters = {
+    "request": limiter_from_env("request", concurrency=8, max_queue=16, max_wait_seconds=10),
+    "llm": limiter_from_env("llm", concurrency=4, max_queue=16, max_wait_seconds=20),
+    "db": limiter_from_env("db", concurrency=8, max_queue=32, max_wait_seconds=10),
+    "embedding": limiter_from_env("embedding", concurrency=2, max_queue=8, max_wait_seconds=5),
+}
+
+@app.exception_handler(Saturated)
+def saturated_handler(request: Request, exc: Saturated):
+    logger.warning(f"Shedding load: {exc}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Server is busy ({exc}). Please retry later."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # --- 2. DATABASE CONNECTION ---
 DB_USER = os.getenv('DB_USER', 'postgres')
 DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -58,14 +93,61 @@ DB_NAME = os.getenv('DB_NAME', 'argo_db')
 engine_string = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 engine = create_engine(engine_string)
 
+# Cache shared by all worker processes (private per-user SQLite file by default, or CACHE_URL=redis://...)
+cache = cache_from_url(os.getenv("CACHE_URL"))
+DB_CONTEXT_TTL = int(os.getenv("DB_CONTEXT_CACHE_TTL", "3600"))
+SQL_CACHE_TTL = int(os.getenv("SQL_CACHE_TTL", "86400"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "300"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", "604800"))
+MAX_CACHED_RESULT_ROWS = 50000  # Larger results are not worth the serialization cost
+QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", "30000"))
+
+# Identical questions and queries that arrive while one is already running share its result.
+question_flight = SingleFlight("question")
+query_flight = SingleFlight("query")
+
+def normalize_question(question: str) -> str:
+    """Key for coalescing questions that differ only in case, spacing or trailing punctuation."""
+    return " ".join(question.casefold().split()).rstrip("?.! ")
+
 def run_query(query_string: str) -> pd.DataFrame:
-    """Executes a SQL query and returns the result as a pandas DataFrame."""
-    try:
-        with engine.connect() as connection:
-            return pd.read_sql(text(query_string), connection)
-    except Exception as e:
-        logger.error(f"Database query failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+    """Executes a SQL query and returns the result as a pandas DataFrame (cached, and shared with concurrent identical queries)."""
+    query_key = canonical_key(query_string)
+    key = make_key("result", query_key)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def execute() -> pd.DataFrame:
+        try:
+            # Generated SQL runs in a read-only transaction with a per-transaction timeout.
+            with limiters["db"].slot(), engine.begin() as connection:
+                connection.execute(text("SET TRANSACTION READ ONLY"))
+                connection.execute(text(f"SET LOCAL statement_timeout = {QUERY_TIMEOUT_MS}"))
+                df = pd.read_sql(text(query_string), connection)
+        except Saturated:
+            raise
+        except Exception as e:
+            logger.error(f"Database query failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+        if len(df) <= MAX_CACHED_RESULT_ROWS:
+            cache.set(key, df, RESULT_CACHE_TTL)
+        return df
+    return query_flight.do(query_key, execute)
+
+CUBE_AVAILABLE = cube_available(engine)
+logger.info(f"Aggregate cube available: {CUBE_AVAILABLE}")
+
+def run_routed_query(query_string: str) -> tuple[pd.DataFrame, str]:
+    """Runs eligible aggregate queries against the pre-aggregated cube, falling back to raw argo_data."""
+    cube_query = route_to_cube(query_string) if CUBE_AVAILABLE else None
+    if cube_query:
+        try:
+            logger.info(f"Answering from aggregate cube: {cube_query}")
+            return run_query(cube_query), cube_query
+        except HTTPException:
+            logger.warning("Cube query failed, falling back to raw data.")
+    return run_query(query_string), query_string
 
 # --- 3. ADVANCED AI CONTEXT ---
 def get_db_context():
@@ -83,6 +165,7 @@ def get_db_context():
         schema_info = "\n".join([f"- {row['column_name']} ({row['data_type']})" for _, row in schema_df.iterrows()])
         date_range_info = f"The data covers dates from {date_range_df['min_date'][0]} to {date_range_df['max_date'][0]}."
         platform_info = "Available platform_number values include: " + ", ".join(platform_df['platform_number'].astype(str).tolist()[:10]) + ", among others."
+        levels_info = describe_standard_levels() if inspect(engine).has_table(STANDARD_LEVELS_TABLE) else ""
 
         full_context = f"""
         You are querying a PostgreSQL table named 'argo_data' with the following schema:
@@ -91,34 +174,96 @@ def get_db_context():
         Contextual Information:
         - {date_range_info}
         - {platform_info}
+
+        {levels_info}
         """
+        cache.set("db_context", full_context, DB_CONTEXT_TTL)
         return full_context
     except Exception as e:
         logger.error(f"Error fetching DB context: {e}")
         return "Database context could not be loaded."
 
-DB_CONTEXT = get_db_context()
+DB_CONTEXT = cache.get("db_context") or get_db_context()
+
+def get_known_schema() -> dict[str, set[str]]:
+    """Columns of every argo table, used to validate generated SQL before it reaches the database."""
+    try:
+        schema_query = "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public' AND table_name LIKE 'argo%'"
+        with engine.connect() as connection:
+            schema_df = pd.read_sql(text(schema_query), connection)
+        return {table: set(group['column_name']) for table, group in schema_df.groupby('table_name')}
+    except Exception as e:
+        logger.error(f"Error fetching schema for SQL validation: {e}")
+        return {}
+
+SCHEMA_RETRY_SECONDS = 30
+KNOWN_SCHEMA: dict[str, set[str]] = {}
+_schema_checked_at = 0.0
+
+def known_schema() -> dict[str, set[str]]:
+    """Schema for SQL validation; retried (at most every SCHEMA_RETRY_SECONDS) until it loads."""
+    global KNOWN_SCHEMA, _schema_checked_at
+    if not KNOWN_SCHEMA and time.monotonic() - _schema_checked_at >= SCHEMA_RETRY_SECONDS:
+        _schema_checked_at = time.monotonic()
+        KNOWN_SCHEMA = cache.get_or_set("known_schema", lambda: get_known_schema() or None, DB_CONTEXT_TTL) or {}
+    if not KNOWN_SCHEMA:
+        logger.error("Schema for SQL validation is unavailable; table/column checks are disabled until it loads.")
+    return KNOWN_SCHEMA
+
+known_schema()
 
 # --- 4. RAG & CORE AI LOGIC ---
+try:
+    float_summaries = cache.get_or_set("float_summaries", lambda: load_float_summaries(engine), DB_CONTEXT_TTL)
+except Exception as e:
+    logger.error(f"Error loading float summaries for retrieval index: {e}")
+    float_summaries = pd.DataFrame(columns=["platform_number", "total_cycles", "first_seen", "last_seen",
+                                            "min_lat", "max_lat", "min_lon", "max_lon"])
+retriever = HybridRetriever(float_summaries)
+logger.info(f"Retrieval index built for {len(retriever.documents)} floats.")
+
+def encode_question(user_question: str) -> list[float]:
+    with limiters["embedding"].slot():
+        return embedding_model.encode(user_question).tolist()
+
+def vector_search(user_question: str, n_results: int) -> list[str]:
+    """Nearest-neighbour search over float summaries in the vector DB. Skipped when the embedding stage is saturated."""
+    try:
+        query_embedding = cache.get_or_set(
+            make_key("embedding", user_question),
+            lambda: encode_question(user_question),
+            EMBEDDING_CACHE_TTL,
+        )
+    except Saturated as e:
+        logger.warning(f"Skipping vector search: {e}")
+        return []
+    results = collection.query(
+        query_embeddings=[query_embedding], 
+        n_results=n_results, 
+        include=['documents']
+    )
+    return results.get('documents', [[]])[0]
+
 def find_relevant_context(user_question: str) -> str:
-    """Searches the vector DB for context relevant to the user's question."""
-    if collection is None or embedding_model is None:
-        return "Vector database not available. Skipping RAG retrieval."
+    """Finds float summaries relevant to the question: exact/keyword index first, vector search as fallback."""
+    vector_available = collection is not None and embedding_model is not None
     try:
-        query_embedding = embedding_model.encode(user_question).tolist()
-        results = collection.query(
-            query_embeddings=[query_embedding], 
-            n_results=3, 
-            include=['documents']
+        documents = retriever.search(
+            user_question,
+            (lambda n: vector_search(user_question, n)) if vector_available else None,
         )
-        context = "\n---\n".join(results.get('documents', [[]])[0])
-        return context if context else "No specific context found in the vector database."
+        context = "\n---\n".join(documents)
+        if context:
+            return context
+        if not vector_available:
+            return "Vector database not available. Skipping RAG retrieval."
+        return "No specific context found in the vector database."
     except Exception as e:
-        logger.error(f"Error during vector search: {e}")
+        logger.error(f"Error during context retrieval: {e}")
         return "Error searching vector database."
 
-def get_sql_query(user_question: str, context: str) -> str:
-    """Converts a user question to a SQL query using Groq."""
+def get_sql_query(user_question: str, context: str, feedback: str = "None.") -> str:
+    """Converts a user question to a SQL query using Groq. `feedback` describes why a previous attempt was rejected."""
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY is not set.")
     
@@ -128,6 +273,7 @@ def get_sql_query(user_question: str, context: str) -> str:
              "You are an expert PostgreSQL query writer. Your task is to convert a user's question into a single, syntactically correct SQL query. "
              "Use the provided **retrieved context** and **database context** to help you write the most accurate query.\n\n"
              "--- RETRIEVED CONTEXT (from vector search) ---\n{context}\n--------------------------------------------\n\n"
+             "--- NAMED REGIONS ---\n{regions}\n---------------------\n\n"
              "Follow these rules precisely:\n"
              "1. **For 'highest'/'lowest'/'latest' records (e.g., 'furthest south'), ALWAYS use `ORDER BY` and `LIMIT 1`.** DO NOT use `GROUP BY`. "
              "   - 'Furthest south' means `ORDER BY latitude ASC LIMIT 1`. 'Furthest west' means `ORDER BY longitude ASC LIMIT 1`.\n"
@@ -137,19 +283,53 @@ def get_sql_query(user_question: str, context: str) -> str:
              "   - For 'deepest measurement location', use a subquery: `SELECT platform_number, latitude, longitude, pressure FROM argo_data WHERE pressure = (SELECT MAX(pressure) FROM argo_data)`\n"
              "3. **For aggregates on a 'top N' subset, ALWAYS use a subquery.**\n"
              "4. **ALWAYS use descriptive aliases for aggregate columns** (e.g., `AVG(temperature) AS average_temperature`).\n"
-             "5. **Interpret geographical terms**: 'equator' means `latitude BETWEEN -5 AND 5`.\n"
+             "5. **Interpret geographical terms using NAMED REGIONS**: for each region listed there, filter with its exact `cell_id` predicate instead of a latitude/longitude box.\n"
              "6. **Always include columns mentioned by the user.** If asked 'Which float...', you must select `platform_number`.\n"
              "7. Only output the SQL query. Nothing else. **DO NOT include any explanation or markdown formatting like ```sql...```.**\n\n"
-             "--- DATABASE CONTEXT ---\n{db_context}\n-------------------------"),
+             "--- DATABASE CONTEXT ---\n{db_context}\n-------------------------\n\n"
+             "--- PREVIOUS ATTEMPT FEEDBACK ---\n{feedback}\n---------------------------------"),
             ("human", "{question}")
         ]
     )
     llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=GROQ_API_KEY)
     chain = prompt | llm
-    response = chain.invoke({"question": user_question, "context": context, "db_context": DB_CONTEXT})
+    regions = describe_regions(resolve_regions(user_question))
+    with limiters["llm"].slot():
+        response = chain.invoke({"question": user_question, "context": context, "regions": regions,
+                                 "db_context": DB_CONTEXT, "feedback": feedback})
     sql_query = response.content.strip().replace("```sql", "").replace("```", "").strip()
     return sql_query
 
+MAX_SQL_ATTEMPTS = 3
+
+def generate_checked_sql(user_question: str, context: str) -> CheckedSQL:
+    """
+    Generates SQL for the question and validates it locally before it reaches the database.
+
+    Rejected queries are regenerated with the error fed back to the LLM, up to
+    MAX_SQL_ATTEMPTS times. Only validated SQL is cached.
+    """
+    cache_key = make_key("sql", normalize_question(user_question), context, DB_CONTEXT)
+    cached_sql = cache.get(cache_key)
+    if cached_sql:
+        try:
+            return check_sql(cached_sql, known_schema())
+        except InvalidSQL:
+            logger.warning("Cached SQL no longer validates, regenerating.")
+
+    feedback = "None."
+    for attempt in range(1, MAX_SQL_ATTEMPTS + 1):
+        sql_query = get_sql_query(user_question, context, feedback)
+        try:
+            checked = check_sql(sql_query, known_schema())
+        except InvalidSQL as e:
+            logger.warning(f"Generated SQL rejected (attempt {attempt}/{MAX_SQL_ATTEMPTS}): {e}")
+            feedback = f"Your previous query was rejected.\nQuery: {sql_query}\nError: {e}\nFix the error and output only the corrected SQL query."
+            continue
+        cache.set(cache_key, checked.sql, SQL_CACHE_TTL)
+        return checked
+    raise HTTPException(status_code=422, detail=f"Could not generate a valid SQL query after {MAX_SQL_ATTEMPTS} attempts. {feedback}")
+
 def get_natural_language_summary(question: str, results_df: pd.DataFrame) -> str:
     """Generates a natural language summary of the query results using Groq."""
     if results_df.empty:
@@ -168,7 +348,8 @@ def get_natural_language_summary(question: str, results_df: pd.DataFrame) -> str
     )
     llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=GROQ_API_KEY)
     chain = prompt | llm
-    response = chain.invoke({"question": question, "results": results_str})
+    with limiters["llm"].slot():
+        response = chain.invoke({"question": question, "results": results_str})
     return response.content
 
 def decompose_question(user_question: str) -> list[str]:
@@ -189,7 +370,8 @@ def decompose_question(user_question: str) -> list[str]:
     
     llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=GROQ_API_KEY)
     chain = prompt | llm
-    response = chain.invoke({"question": user_question})
+    with limiters["llm"].slot():
+        response = chain.invoke({"question": user_question})
     
     logger.info(f"Decomposer LLM raw output: {response.content}")
     cleaned_content = response.content.strip().removeprefix("```json").removesuffix("```").strip()
@@ -219,19 +401,19 @@ def synthesize_answers(original_question: str, individual_answers: list[dict]) -
     
     llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key=GROQ_API_KEY)
     chain = prompt | llm
-    response = chain.invoke({"original_question": original_question, "answers_text": answers_text})
+    with limiters["llm"].slot():
+        response = chain.invoke({"original_question": original_question, "answers_text": answers_text})
     
     return response.content
 
 def answer_single_question(question: str) -> dict:
     """Refactored core logic to handle one question and return a dictionary."""
     context = find_relevant_context(question)
-    sql_query = get_sql_query(question, context)
-    full_results_df = run_query(sql_query)
+    sql_query = generate_checked_sql(question, context).sql
+    full_results_df, sql_query = run_routed_query(sql_query)
     total_rows = len(full_results_df)
 
     MAX_ROWS_FOR_SUMMARY = 50  # Reduced for Groq token limits
-    MAX_ROWS_FOR_FRONTEND = 100  # Limit data sent to frontend to prevent browser freeze
     
     df_for_summary = full_results_df.head(MAX_ROWS_FOR_SUMMARY)
     summary = get_natural_language_summary(question, df_for_summary)
@@ -239,8 +421,20 @@ def answer_single_question(question: str) -> dict:
     if total_rows > MAX_ROWS_FOR_SUMMARY:
         summary += f"\n\n*Note: Summary based on first {MAX_ROWS_FOR_SUMMARY} rows of {total_rows:,} total records.*"
 
-    # Limit data sent to frontend
-    results_df = full_results_df.head(MAX_ROWS_FOR_FRONTEND).copy()
+    return {
+        "question": question,
+        "summary": summary,
+        "data": format_results_for_frontend(full_results_df),
+        "sql_query": sql_query,
+        "total_rows": total_rows,  # Add total row count for info
+    }
+
+MAX_ROWS_FOR_FRONTEND = 100  # Point budget for the frontend to prevent browser freeze
+
+def format_results_for_frontend(full_results_df: pd.DataFrame) -> list[dict]:
+    """Downsamples a result to the frontend budget and converts it to JSON-safe records."""
+    # Downsample data sent to frontend, keeping the shape and extremes of the result
+    results_df = downsample_frame(full_results_df, MAX_ROWS_FOR_FRONTEND).copy()
     
     for col in results_df.columns:
         if pd.api.types.is_numeric_dtype(results_df[col].dtype):
@@ -256,15 +450,7 @@ def answer_single_question(question: str) -> dict:
                  results_df[col] = results_df[col].astype(str)
     
     results_df.replace({np.nan: None}, inplace=True)
-
-
-    return {
-        "question": question,
-        "summary": summary,
-        "data": results_df.to_dict(orient='records'),
-        "sql_query": sql_query,
-        "total_rows": total_rows,  # Add total row count for info
-    }
+    return results_df.to_dict(orient='records')
 
 # --- 6. API ENDPOINT ---
 class QueryRequest(BaseModel):
@@ -274,13 +460,19 @@ class QueryRequest(BaseModel):
 def ask_question(request: QueryRequest):
     """The main endpoint, now with multi-question handling."""
     logger.info(f"Received question: {request.question}")
-    
+    def admitted_answer() -> dict:
+        with limiters["request"].slot():
+            return answer_question(request.question)
+    return question_flight.do(normalize_question(request.question), admitted_answer)
+
+def answer_question(question: str, on_sub_answer: Callable[[dict], None] | None = None) -> dict:
+    """Decomposes, answers and synthesizes a user question. `on_sub_answer` receives each partial answer."""
     try:
-        simple_questions = decompose_question(request.question)
+        simple_questions = decompose_question(question)
 
         if len(simple_questions) <= 1:
             logger.info("Treating as a single question.")
-            result = answer_single_question(request.question)
+            result = answer_single_question(question)
             return {
                 "summary": result['summary'],
                 "data": result['data'],
@@ -294,16 +486,20 @@ def ask_question(request: QueryRequest):
         for q in simple_questions:
             try:
                 answer_dict = answer_single_question(q)
-                individual_answers.append(answer_dict)
+            except Saturated:
+                raise
             except Exception as e:
                 logger.error(f"Error answering sub-question '{q}': {e}")
-                individual_answers.append({
+                answer_dict = {
                     "question": q,
                     "summary": f"I was unable to answer the question: '{q}'.",
                     "data": [], "sql_query": "Error"
-                })
+                }
+            individual_answers.append(answer_dict)
+            if on_sub_answer:
+                on_sub_answer(answer_dict)
         
-        final_summary = synthesize_answers(request.question, individual_answers)
+        final_summary = synthesize_answers(question, individual_answers)
         
         return {
             "summary": final_summary,
@@ -311,10 +507,179 @@ def ask_question(request: QueryRequest):
             "is_multi_part": True,
         }
 
+    except (HTTPException, Saturated):
+        raise
+    except Exception as e:
+        logger.exception(f"An error occurred during query processing for question: {question}")
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+
+# --- 6b. BACKGROUND JOBS ---
+# Long multi-part questions run on a bounded worker pool; clients poll for status.
+try:
+    job_store = JobStore(
+        os.getenv("JOB_STORE_PATH") or private_data_path("jobs.sqlite3"),
+        ttl_seconds=int(os.getenv("JOB_TTL_SECONDS", "3600")),
+    )
+    job_runner = JobRunner(
+        job_store,
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_pending=int(os.getenv("JOB_MAX_PENDING", "20")),
+    )
+except Exception as e:
+    logger.error(f"Job store unavailable, background jobs are disabled: {e}")
+    job_store = job_runner = None
+
+def require_jobs() -> tuple[JobStore, JobRunner]:
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Background jobs are unavailable: their store could not be opened.")
+    return job_store, job_runner
+
+@app.post("/jobs", status_code=202)
+def create_job(request: QueryRequest):
+    """Queues a question for background processing and returns a job ID to poll."""
+    logger.info(f"Received job question: {request.question}")
+    _, runner = require_jobs()
+    try:
+        job_id = runner.submit(request.question, answer_question)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full, try again later ({e}).")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Returns job status, sub-answers completed so far and, once finished, the final result."""
+    store, _ = require_jobs()
+    job = store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+# --- 6c. LIVE QUERIES ---
+# Registered dashboard queries refresh incrementally from a juld high-water mark.
+# Stored durably in a private SQLite file, not the cache, so eviction or a disabled cache never loses them.
+try:
+    live_query_store = LiveQueryStore(
+        os.getenv("LIVE_QUERY_STORE_PATH") or private_data_path("live_queries.sqlite3"),
+        ttl_seconds=int(os.getenv("LIVE_QUERY_TTL_SECONDS", "604800")),
+    )
+except Exception as e:
+    logger.error(f"Live query store unavailable, live queries are disabled: {e}")
+    live_query_store = None
+live_query_flight = SingleFlight("live_query")
+
+def require_live_query_store() -> LiveQueryStore:
+    if live_query_store is None:
+        raise HTTPException(status_code=503, detail="Live queries are unavailable: their store could not be opened.")
+    return live_query_store
+
+def live_query_response(live, new_rows: int) -> dict:
+    return {
+        "live_query_id": live.id,
+        "question": live.question,
+        "sql_query": live.sql_query,
+        "mode": live.mode,
+        "watermark": live.watermark.isoformat() if live.watermark else None,
+        "refreshed_at": live.refreshed_at.isoformat() if live.refreshed_at else None,
+        "new_rows": new_rows,
+        "total_rows": len(live.result),
+        "data": format_results_for_frontend(live.result),
+    }
+
+def refresh_live_query(live) -> dict:
+    new_rows = refresh(live, engine, run_query)
+    require_live_query_store().save(live)
+    return live_query_response(live, new_rows)
+
+@app.post("/live-queries", status_code=201)
+def create_live_query(request: QueryRequest):
+    """Registers a question as a live query and returns its first full result."""
+    logger.info(f"Registering live query: {request.question}")
+    store = require_live_query_store()
+    try:
+        sql_query = generate_checked_sql(request.question, find_relevant_context(request.question)).sql
+        live = store.create(request.question, sql_query)
+        logger.info(f"Live query {live.id} refreshes in '{live.mode}' mode.")
+        return refresh_live_query(live)
+    except (HTTPException, Saturated):
+        raise
+    except Exception as e:
+        logger.exception(f"Failed to register live query: {request.question}")
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+
+@app.get("/live-queries/{live_query_id}")
+def get_live_query(live_query_id: str):
+    """Refreshes a live query with rows newer than its watermark and returns the merged result."""
+    store = require_live_query_store()
+
+    def do_refresh() -> dict:
+        live = store.get(live_query_id)
+        if live is None:
+            raise HTTPException(status_code=404, detail="Live query not found or expired.")
+        return refresh_live_query(live)
+    try:
+        return live_query_flight.do(live_query_id, do_refresh)
+    except (HTTPException, Saturated):
+        raise
     except Exception as e:
-        logger.exception(f"An error occurred during query processing for question: {request.question}")
+        logger.exception(f"Failed to refresh live query: {live_query_id}")
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
 
+# --- 6d. FLOAT TRAJECTORIES ---
+# Tracks are precomputed and simplified per zoom level at load time; responses carry ETags.
+TRAJECTORY_CACHE_TTL = int(os.getenv("TRAJECTORY_CACHE_TTL", "86400"))
+TRAJECTORY_MAX_AGE = int(os.getenv("TRAJECTORY_MAX_AGE", "3600"))
+MAX_TRAJECTORIES = 500
+
+def etag_response(request: Request, payload) -> Response:
+    """JSON response with a content-hash ETag; answers 304 when the client already has it."""
+    body = json.dumps(payload, separators=(",", ":"))
+    etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={TRAJECTORY_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def read_trajectories(fetch: Callable, *args):
+    with limiters["db"].slot():
+        return fetch(engine, *args)
+
+@app.get("/floats/{platform_number}/trajectory")
+def float_trajectory(platform_number: str, request: Request, zoom: int = 8):
+    """Simplified track of one float (one [lat, lon] per cycle at full detail) for the given map zoom."""
+    zoom = resolve_zoom(zoom)
+    payload = cache.get_or_set(
+        make_key("trajectory", platform_number, str(zoom)),
+        lambda: read_trajectories(fetch_trajectory, platform_number, zoom),
+        TRAJECTORY_CACHE_TTL,
+    )
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"No trajectory for float {platform_number}.")
+    return etag_response(request, payload)
+
+@app.get("/trajectories")
+def trajectories_in_bbox(request: Request, bbox: str, zoom: int = 2, limit: int = 200):
+    """
+    Simplified tracks of all floats intersecting bbox=min_lon,min_lat,max_lon,max_lat.
+
+    min_lon > max_lon means the view crosses the antimeridian.
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'min_lon,min_lat,max_lon,max_lat'.")
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min_lat must not exceed max_lat.")
+    if not (-90 <= min_lat and max_lat <= 90 and all(-180 <= lon <= 180 for lon in (min_lon, max_lon))):
+        raise HTTPException(status_code=400, detail="bbox must lie within longitudes [-180, 180] and latitudes [-90, 90].")
+    zoom, limit = resolve_zoom(zoom), max(1, min(limit, MAX_TRAJECTORIES))
+    bounds = (min_lon, min_lat, max_lon, max_lat)
+    tracks = cache.get_or_set(
+        make_key("trajectories", json.dumps(bounds), str(zoom), str(limit)),
+        lambda: read_trajectories(fetch_trajectories_in_bbox, bounds, zoom, limit),
+        TRAJECTORY_CACHE_TTL,
+    )
+    return etag_response(request, {"zoom": zoom, "bbox": list(bounds), "count": len(tracks), "trajectories": tracks})
+
 # --- 7. HEALTH CHECK ENDPOINT ---
 @app.get("/")
 def root():
@@ -325,6 +690,9 @@ def root():
         "endpoints": {
             "health": "/health",
             "ask": "/ask (POST)",
+            "jobs": "/jobs (POST), /jobs/{job_id} (GET)",
+            "live_queries": "/live-queries (POST), /live-queries/{live_query_id} (GET)",
+            "trajectories": "/floats/{platform_number}/trajectory (GET), /trajectories?bbox=min_lon,min_lat,max_lon,max_lat (GET)",
             "docs": "/docs"
         }
     }
@@ -344,5 +712,8 @@ def health_check():
         "status": "online",
         "database_connection": db_status,
         "rag_components": rag_status,
-        "db_context_loaded": bool(DB_CONTEXT)
+        "db_context_loaded": bool(DB_CONTEXT),
+        "in_flight": {"questions": question_flight.in_flight(), "queries": query_flight.in_flight()},
+        "pending_jobs": job_runner.pending() if job_runner else None,
+        "admission": {name: limiter.stats() for name, limiter in limiters.items()},
     }
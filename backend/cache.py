@@ -0,0 +1,173 @@
+# cache.py
+"""
+Pluggable cache shared across worker processes.
+
+`SQLiteCache` stores pickled values in a local SQLite file, so every uvicorn
+worker on a host shares one warm cache. `RedisCache` points at an external
+store for multi-host deployments. Pick one with `cache_from_url`.
+Cache failures are logged and treated as misses; they never fail a request.
+
+Values are unpickled on read, so the store must only be writable by this
+service: the SQLite file lives in a private per-user directory by default, and
+files or directories that other users could write are refused.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(namespace: str, *parts: str) -> str:
+    """Builds a compact cache key from a namespace and arbitrary-length parts."""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class CacheBackend:
+    """Base cache interface. Subclasses implement `_get` and `_set` on pickled bytes."""
+
+    def _get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Any | None:
+        try:
+            raw = self._get(key)
+            return pickle.loads(raw) if raw is not None else None
+        except Exception as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            self._set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+
+    def get_or_set(self, key: str, fn: Callable[[], Any], ttl: int) -> Any:
+        """Returns the cached value for `key`, computing and storing it with `fn` on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+
+class NullCache(CacheBackend):
+    """Disables caching."""
+
+    def _get(self, key: str) -> bytes | None:
+        return None
+
+    def _set(self, key: str, value: bytes, ttl: int) -> None:
+        pass
+
+
+def private_data_path(filename: str) -> str:
+    """`filename` in a private per-user directory, e.g. ~/.cache/floatchart/<filename> (directory mode 0700)."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    directory = os.path.join(base, "floatchart")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def default_cache_path() -> str:
+    """Private per-user cache file, e.g. ~/.cache/floatchart/cache.sqlite3."""
+    return private_data_path("cache.sqlite3")
+
+
+def ensure_private(path: str) -> None:
+    """Creates `path` with mode 0600 and refuses files or directories other users could write."""
+    if hasattr(os, "getuid"):  # POSIX ownership checks; skipped on Windows
+        # SQLite keeps -wal/-shm files next to the database, so the directory must be private too.
+        directory = os.path.dirname(os.path.abspath(path))
+        dir_stat = os.stat(directory)
+        if dir_stat.st_uid not in (os.getuid(), 0) or dir_stat.st_mode & 0o022:
+            raise PermissionError(f"{directory} is writable by other users; use a private directory for the cache")
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    if hasattr(os, "getuid"):
+        if os.stat(path).st_uid != os.getuid():
+            raise PermissionError(f"{path} is not owned by the current user")
+        os.chmod(path, 0o600)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in a local SQLite file, shared by all processes on the host."""
+
+    PURGE_EVERY = 500  # sets between sweeps of expired entries
+
+    def __init__(self, path: str):
+        ensure_private(path)
+        self.path = path
+        self._sets = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str) -> bytes | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: int) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+            self._sets += 1
+            if self._sets % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+
+class RedisCache(CacheBackend):
+    """Cache in an external Redis server. Requires the optional `redis` package."""
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+
+    def _get(self, key: str) -> bytes | None:
+        return self.client.get(key)
+
+    def _set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+
+def _backend_from_url(url: str | None) -> CacheBackend:
+    if not url:
+        return SQLiteCache(default_cache_path())
+    if url == "none":
+        return NullCache()
+    if url.startswith("sqlite:///"):
+        # As in SQLAlchemy: sqlite:///relative/path, sqlite:////absolute/path
+        return SQLiteCache(url.removeprefix("sqlite:///"))
+    if url.startswith(("redis://", "rediss://")):
+        return RedisCache(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+def cache_from_url(url: str | None) -> CacheBackend:
+    """
+    Creates a backend from `sqlite:///path/to/file`, `redis://...` or `none`.
+
+    An empty URL uses a private per-user SQLite file. If the backend cannot be
+    set up, the error is logged and caching is disabled instead.
+    """
+    try:
+        return _backend_from_url(url)
+    except Exception as e:
+        logger.error(f"Cache backend {url or 'default'} unavailable, caching disabled: {e}")
+        return NullCache()
@@ -0,0 +1,268 @@
+# data_cube.py
+"""
+Pre-aggregated spatio-temporal cube over argo_data.
+
+The cube holds one row per (lat/lon grid cell, depth bin, month, variable) with
+count/sum/sumsq/min/max measures, keyed by the same `cell_id` as argo_data.
+Measurements with a NULL position, pressure or juld are kept in NULL cells,
+bins or months, so predicates on the cube exclude them exactly as the same
+predicates on argo_data do, and unfiltered aggregates still count them.
+It reads argo_data.cell_id, so it must be built after the region index. `build_cube` creates it at load time and
+`route_to_cube` rewrites eligible aggregate queries so they read the cube
+instead of scanning raw measurements.
+"""
+
+import re
+from sqlalchemy import inspect, text
+
+from sql_text import normalize_sql, split_top_level
+
+CUBE_TABLE = "argo_cube"
+CELL_DEGREES = 1.0
+# Pressure (dbar) bin edges. Filters on pressure only route to the cube when
+# their bounds fall on one of the interior edges; the outer bins also hold
+# pressures below 0 and above 10000.
+DEPTH_EDGES = (0, 10, 20, 50, 100, 200, 300, 500, 700, 1000, 1500, 2000, 3000, 10000)
+CUBE_VARIABLES = ("temperature", "salinity", "pressure")
+
+_NUM = r"-?\d+(?:\.\d+)?"
+_VAR = "|".join(CUBE_VARIABLES)
+_AGG_RE = re.compile(rf"(AVG|MIN|MAX|SUM|COUNT|STDDEV|STDDEV_SAMP)\(\s*({_VAR})\s*\)", re.IGNORECASE)
+_EXTRACT_RE = re.compile(r"EXTRACT\(\s*(MONTH|YEAR)\s+FROM\s+juld\s*\)", re.IGNORECASE)
+_TRUNC_RE = re.compile(r"DATE_TRUNC\(\s*'month'\s*,\s*juld\s*\)", re.IGNORECASE)
+_ITEM_RE = re.compile(r"^(?P<expr>.+?)(?:\s+(?:AS\s+)?(?P<alias>\w+))?$", re.IGNORECASE)
+_ORDER_RE = re.compile(r"^(?P<term>.+?)(?P<direction>\s+(?:ASC|DESC))?$", re.IGNORECASE)
+_QUERY_RE = re.compile(
+    r"^SELECT\s+(?P<select>.+?)\s+FROM\s+argo_data"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?$",
+    re.IGNORECASE,
+)
+_CONDITION_RE = re.compile(
+    rf"(?P<between_col>latitude|longitude|pressure)\s+BETWEEN\s+(?P<lo>{_NUM})\s+AND\s+(?P<hi>{_NUM})"
+    rf"|(?P<cmp_col>latitude|longitude|pressure)\s*(?P<op>>=|<=|<|>)\s*(?P<value>{_NUM})"
+    rf"|EXTRACT\(\s*(?P<part>MONTH|YEAR)\s+FROM\s+juld\s*\)\s*=\s*(?P<number>\d+)"
+    r"|(?P<region>cell_id\s+IN\s+\(\s*SELECT\s+cell_id\s+FROM\s+argo_region_cells\s+WHERE\s+region\s*=\s*'\w+'\s*\))",
+    re.IGNORECASE,
+)
+_COLUMN_EDGES = {
+    "latitude": ("lat_lo", "lat_hi"),
+    "longitude": ("lon_lo", "lon_hi"),
+    "pressure": ("pres_lo", "pres_hi"),
+}
+
+
+def cube_sql() -> str:
+    """The CREATE TABLE ... AS statement that builds the cube from argo_data."""
+    edges = f"ARRAY[{', '.join(str(float(e)) for e in DEPTH_EDGES)}]::float8[]"
+    values = ",\n                ".join(f"('{var}', {var}::float8)" for var in CUBE_VARIABLES)
+    return f"""
+    CREATE TABLE {CUBE_TABLE} AS
+    WITH binned AS (
+        SELECT
+            floor(latitude / {CELL_DEGREES}) * {CELL_DEGREES} AS lat_lo,
+            floor(longitude / {CELL_DEGREES}) * {CELL_DEGREES} AS lon_lo,
+            cell_id,
+            -- LEAST ignores NULLs, so keep a NULL pressure's bin NULL explicitly.
+            CASE WHEN pressure IS NOT NULL
+                 THEN LEAST(width_bucket(GREATEST(pressure, 0)::float8, {edges}), {len(DEPTH_EDGES) - 1})
+            END AS depth_bin,
+            date_trunc('month', juld) AS month,
+            v.variable,
+            v.value
+        FROM argo_data
+        CROSS JOIN LATERAL (VALUES
+                {values}
+        ) AS v(variable, value)
+        WHERE v.value IS NOT NULL
+    )
+    SELECT
+        lat_lo, lat_lo + {CELL_DEGREES} AS lat_hi,
+        lon_lo, lon_lo + {CELL_DEGREES} AS lon_hi,
+        cell_id,
+        ({edges})[depth_bin] AS pres_lo,
+        ({edges})[depth_bin + 1] AS pres_hi,
+        month,
+        variable,
+        COUNT(*) AS value_count,
+        SUM(value) AS value_sum,
+        SUM(value * value) AS value_sumsq,
+        MIN(value) AS value_min,
+        MAX(value) AS value_max
+    FROM binned
+    GROUP BY lat_lo, lon_lo, cell_id, depth_bin, month, variable;
+    """
+
+
+def build_cube(engine) -> None:
+    """(Re)creates the cube table from argo_data. Run after the raw data is loaded."""
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {CUBE_TABLE}"))
+        connection.execute(text(cube_sql()))
+        connection.execute(text(f"CREATE INDEX ON {CUBE_TABLE} (variable, pres_lo, lat_lo, lon_lo)"))
+        connection.execute(text(f"CREATE INDEX ON {CUBE_TABLE} (variable, month)"))
+        connection.execute(text(f"CREATE INDEX ON {CUBE_TABLE} (variable, cell_id)"))
+
+
+def cube_available(engine) -> bool:
+    """Returns True if the cube table has been built in the connected database."""
+    try:
+        return inspect(engine).has_table(CUBE_TABLE)
+    except Exception:
+        return False
+
+
+def _on_grid(value: float) -> bool:
+    steps = value / CELL_DEGREES
+    return abs(steps - round(steps)) < 1e-9
+
+
+def _bound(column: str, op: str, value: float) -> str | None:
+    """
+    Maps a raw-column bound to an equivalent cube-edge condition, or None.
+
+    Cube cells are half-open [lo, hi), so only `>= edge` and `< edge` select
+    exactly the same rows; `>`, `<=` and BETWEEN would include or drop values
+    lying on an edge.
+    """
+    aligned = value in DEPTH_EDGES[1:-1] if column == "pressure" else _on_grid(value)
+    if not aligned or op not in (">=", "<"):
+        return None
+    lo_col, hi_col = _COLUMN_EDGES[column]
+    return f"{lo_col} >= {value}" if op == ">=" else f"{hi_col} <= {value}"
+
+
+def _translate_conditions(where: str) -> list[str] | None:
+    conditions, rest = [], where.strip()
+    while rest:
+        match = _CONDITION_RE.match(rest)
+        if not match:
+            return None
+        if match["between_col"]:
+            # BETWEEN includes its upper bound, which a half-open cell edge cannot express.
+            return None
+        elif match["region"]:
+            # Named-region lookups use the same cell_id column in the cube.
+            translated = [match["region"]]
+        elif match["cmp_col"]:
+            translated = [_bound(match["cmp_col"].lower(), match["op"], float(match["value"]))]
+        else:
+            translated = [f"EXTRACT({match['part'].upper()} FROM month) = {match['number']}"]
+        if None in translated:
+            return None
+        conditions.extend(translated)
+        rest = rest[match.end():]
+        separator = re.match(r"\s+AND\s+", rest, re.IGNORECASE)
+        if separator:
+            rest = rest[separator.end():]
+        elif rest.strip():
+            return None
+    return conditions
+
+
+def _translate_aggregate(function: str, variable: str) -> str:
+    only = f"FILTER (WHERE variable = '{variable}')"
+    count, total = f"SUM(value_count) {only}", f"SUM(value_sum) {only}"
+    if function == "COUNT":
+        return f"COALESCE({count}, 0)::bigint"
+    if function == "SUM":
+        return total
+    if function == "AVG":
+        return f"{total} / NULLIF({count}, 0)"
+    if function in ("MIN", "MAX"):
+        return f"{function}(value_{function.lower()}) {only}"
+    # Sample standard deviation from the sum of squares.
+    return (f"SQRT(GREATEST(SUM(value_sumsq) {only} - {total} ^ 2 / NULLIF({count}, 0), 0)"
+            f" / NULLIF({count} - 1, 0))")
+
+
+def _translate_dimension(expr: str) -> str | None:
+    """Translates a month/year expression over juld to its cube equivalent."""
+    expr = expr.strip()
+    extract = _EXTRACT_RE.fullmatch(expr)
+    if extract:
+        return f"EXTRACT({extract[1].upper()} FROM month)"
+    if _TRUNC_RE.fullmatch(expr):
+        return "month"
+    return None
+
+
+def route_to_cube(sql_query: str) -> str | None:
+    """
+    Rewrites an aggregate query over argo_data into an equivalent query over the cube.
+
+    Only SELECTs of AVG/MIN/MAX/SUM/COUNT/STDDEV on cube variables, optionally
+    grouped by month or year of juld and filtered by named regions or by
+    lat/lon/pressure bounds of the form `>= edge` / `< edge`, are eligible.
+    Returns None when the query must run on raw data.
+    """
+    match = _QUERY_RE.match(normalize_sql(sql_query))
+    if not match:
+        return None
+
+    select_items, variables, dimensions = [], set(), {}
+    for position, item in enumerate(split_top_level(match["select"]), start=1):
+        parsed = _ITEM_RE.match(item)
+        expr, alias = parsed["expr"].strip(), parsed["alias"]
+        aggregate = _AGG_RE.fullmatch(expr)
+        if aggregate:
+            function = aggregate[1].upper().replace("STDDEV_SAMP", "STDDEV")
+            variables.add(aggregate[2].lower())
+            translated = _translate_aggregate(function, aggregate[2].lower())
+            alias = alias or aggregate[1].lower()
+        else:
+            translated = _translate_dimension(expr)
+            if translated is None:
+                return None
+            alias = alias or ("date_trunc" if translated == "month" else "extract")
+            dimensions[translated] = {alias.lower(), str(position)}
+        select_items.append(f"{translated} AS {alias}")
+    if not variables:
+        return None
+
+    conditions = [f"variable IN ({', '.join(repr(v) for v in sorted(variables))})"]
+    if match["where"]:
+        translated_conditions = _translate_conditions(match["where"])
+        if translated_conditions is None:
+            return None
+        conditions.extend(translated_conditions)
+
+    group_items = []
+    if match["group"]:
+        for item in split_top_level(match["group"]):
+            translated = _translate_dimension(item)
+            if translated is None:
+                translated = next((d for d, names in dimensions.items() if item.lower() in names), None)
+            if translated is None:
+                return None
+            group_items.append(translated)
+    if set(group_items) != set(dimensions):
+        return None
+
+    order_items = []
+    if match["order"]:
+        for item in split_top_level(match["order"]):
+            parsed = _ORDER_RE.match(item)
+            term, direction = parsed["term"].strip(), parsed["direction"] or ""
+            aggregate = _AGG_RE.fullmatch(term)
+            if aggregate:
+                function = aggregate[1].upper().replace("STDDEV_SAMP", "STDDEV")
+                if aggregate[2].lower() not in variables:
+                    return None
+                term = _translate_aggregate(function, aggregate[2].lower())
+            elif _translate_dimension(term):
+                term = _translate_dimension(term)
+            elif not re.fullmatch(r"\w+", term):
+                return None
+            order_items.append(f"{term}{direction.upper()}")
+
+    cube_query = f"SELECT {', '.join(select_items)} FROM {CUBE_TABLE} WHERE {' AND '.join(conditions)}"
+    if group_items:
+        cube_query += f" GROUP BY {', '.join(group_items)}"
+    if order_items:
+        cube_query += f" ORDER BY {', '.join(order_items)}"
+    if match["limit"]:
+        cube_query += f" LIMIT {match['limit']}"
+    return cube_query
@@ -0,0 +1,149 @@
+# downsample.py
+"""
+Visually faithful downsampling of query results for charts and maps.
+
+Series are reduced with Largest-Triangle-Three-Buckets (LTTB) and lat/lon
+points with grid thinning. Both keep the rows holding the minimum and maximum
+of every numeric column, so extremes survive the reduction. Results whose
+positions barely vary (e.g. a single profile) are treated as series, so their
+vertical shape is kept rather than collapsed to a few map points.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Candidate x-axes for series, in order of preference.
+SERIES_AXES = ("juld", "pressure", "cycle_number")
+PREFERRED_VALUES = ("temperature", "salinity", "pressure")
+# Grid-thin only when distinct positions exceed this fraction of the row budget.
+MIN_POSITION_FRACTION = 0.25
+POSITION_DECIMALS = 4
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Returns the indices of `n_out` points chosen by LTTB. `x` must be sorted."""
+    size = len(x)
+    if n_out >= size:
+        return np.arange(size)
+    if n_out < 3:
+        return np.array([0, size - 1])[:n_out]
+
+    # n_out - 2 buckets between the fixed first and last points.
+    edges = np.linspace(1, size - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, size - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else size
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (avg_y - y[anchor]))
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+    return selected
+
+
+def thin_points(lat: np.ndarray, lon: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Returns `n_out` point indices spread over the occupied area.
+
+    Keeps the first point in each occupied grid cell, coarsening the grid until
+    at most `n_out` remain, then fills the rest of the budget evenly from the
+    previous (finer) grid's points, or from all points if none was finer.
+    """
+    valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    if len(valid) <= n_out:
+        return valid
+    lat, lon = lat[valid], lon[valid]
+    lat_span = max(lat.max() - lat.min(), 1e-9)
+    lon_span = max(lon.max() - lon.min(), 1e-9)
+
+    cells = max(int(np.sqrt(n_out)), 1)
+    grid, finer = cells * 8, None
+    while True:
+        lat_bin = np.minimum(((lat - lat.min()) / lat_span * grid).astype(int), grid - 1)
+        lon_bin = np.minimum(((lon - lon.min()) / lon_span * grid).astype(int), grid - 1)
+        _, first = np.unique(lat_bin * grid + lon_bin, return_index=True)
+        # A grid of `cells` x `cells` can never exceed the budget, so this terminates.
+        if len(first) <= n_out or grid <= cells:
+            break
+        finer, grid = first, max(grid // 2, cells)
+
+    pool = finer if finer is not None else np.arange(len(valid))
+    extra = np.setdiff1d(pool, first)
+    missing = min(n_out - len(first), len(extra))
+    if missing > 0:
+        first = np.union1d(first, extra[np.linspace(0, len(extra), missing, endpoint=False).astype(int)])
+    return valid[np.sort(first)]
+
+
+def _positions_vary(df: pd.DataFrame, budget: int) -> bool:
+    """True when there are enough distinct lat/lon positions for a map to be the right reduction."""
+    if not {"latitude", "longitude"} <= set(df.select_dtypes(include="number").columns):
+        return False
+    positions = df[["latitude", "longitude"]].dropna().round(POSITION_DECIMALS).drop_duplicates()
+    return len(positions) > MIN_POSITION_FRACTION * budget
+
+
+def _extreme_indices(df: pd.DataFrame) -> np.ndarray:
+    """Positions of the rows holding the min and max of each numeric column."""
+    positions = set()
+    for col in df.select_dtypes(include="number").columns:
+        values = df[col].to_numpy(dtype=float)
+        if np.isfinite(values).any():
+            positions.update((int(np.nanargmin(values)), int(np.nanargmax(values))))
+    return np.array(sorted(positions), dtype=int)
+
+
+def _series_axes(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray] | None:
+    numeric = df.select_dtypes(include="number").columns
+    # The first candidate axis that varies: a single profile has one juld, so it uses pressure.
+    x_col = next((c for c in SERIES_AXES if c in df.columns and df[c].nunique() > 1), None)
+    candidates = [c for c in PREFERRED_VALUES if c in numeric and c != x_col]
+    candidates += [c for c in numeric if c != x_col and c not in candidates]
+    if not candidates:
+        return None
+
+    if x_col is None:
+        x = np.arange(len(df), dtype=float)
+    elif pd.api.types.is_datetime64_any_dtype(df[x_col]):
+        # NaT becomes NaN (not the int64 minimum), so those rows are skipped.
+        x = df[x_col].to_numpy(dtype="datetime64[ns]").astype("int64").astype(float)
+        x[df[x_col].isna().to_numpy()] = np.nan
+    elif pd.api.types.is_numeric_dtype(df[x_col]):
+        x = df[x_col].to_numpy(dtype=float)
+    else:
+        return None
+    y = df[candidates[0]].to_numpy(dtype=float)
+    return x, y
+
+
+def downsample_frame(df: pd.DataFrame, max_rows: int) -> pd.DataFrame:
+    """
+    Reduces a result to at most `max_rows` rows while preserving its shape.
+
+    Results with varying latitude/longitude are grid-thinned, other numeric
+    results are reduced with LTTB along juld, pressure or row order, and
+    anything else is truncated. Rows are returned in their original order.
+    """
+    if len(df) <= max_rows:
+        return df
+
+    extremes = _extreme_indices(df)
+    if len(extremes) >= max_rows:
+        return df.iloc[extremes[:max_rows]]
+    budget = max_rows - len(extremes)
+
+    if _positions_vary(df, budget):
+        chosen = thin_points(df["latitude"].to_numpy(dtype=float), df["longitude"].to_numpy(dtype=float), budget)
+    else:
+        axes = _series_axes(df)
+        if axes is None:
+            return df.head(max_rows)
+        x, y = axes
+        finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        order = finite[np.argsort(x[finite], kind="stable")]
+        chosen = order[lttb(x[order], y[order], budget)]
+
+    return df.iloc[np.union1d(chosen, extremes)]
@@ -0,0 +1,39 @@
+# float_documents.py
+"""Per-float summary documents shared by the vector DB loader and the retrieval index."""
+
+import pandas as pd
+from sqlalchemy import text
+
+# Query to get a summary for each unique float
+FLOAT_SUMMARY_QUERY = """
+SELECT
+    platform_number,
+    COUNT(DISTINCT cycle_number) as total_cycles,
+    MIN(juld)::date as first_seen,
+    MAX(juld)::date as last_seen,
+    MIN(latitude) as min_lat,
+    MAX(latitude) as max_lat,
+    MIN(longitude) as min_lon,
+    MAX(longitude) as max_lon
+FROM
+    argo_data
+GROUP BY
+    platform_number
+ORDER BY
+    platform_number;
+"""
+
+
+def load_float_summaries(engine) -> pd.DataFrame:
+    """Fetches one summary row per float."""
+    with engine.connect() as connection:
+        return pd.read_sql(text(FLOAT_SUMMARY_QUERY), connection)
+
+
+def format_float_document(row) -> str:
+    """Creates a simple, descriptive sentence for a float summary row."""
+    return (
+        f"ARGO float with platform number {row['platform_number']} was active from {row['first_seen']} to {row['last_seen']}. "
+        f"It recorded {row['total_cycles']} cycles. "
+        f"Its operational area was between latitudes {row['min_lat']:.2f} and {row['max_lat']:.2f}, and longitudes {row['min_lon']:.2f} and {row['max_lon']:.2f}."
+    )
@@ -0,0 +1,152 @@
+# jobs.py
+"""
+Background jobs for long-running questions.
+
+`JobStore` keeps job status, partial sub-answers and final results in a local,
+private SQLite file, so any web worker can answer a status poll. `JobRunner` executes
+jobs on a bounded thread pool and refuses new work once its queue is full.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from cache import ensure_private
+
+
+class JobQueueFull(Exception):
+    """Raised when the worker pool already has the maximum number of pending jobs."""
+
+
+class JobStore:
+    """SQLite-backed job records that expire `ttl_seconds` after their last update."""
+
+    def __init__(self, path: str, ttl_seconds: int):
+        # Job results can hold query data; refuse files or directories other users could write.
+        ensure_private(path)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    sub_answers TEXT NOT NULL DEFAULT '[]',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, question: str) -> str:
+        """Creates a queued job and returns its ID. Also drops expired jobs."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT INTO jobs (id, question, status, created_at, updated_at, expires_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, question, now, now, now + self.ttl_seconds),
+            )
+        return job_id
+
+    def update(self, job_id: str, status: str, result: dict | None = None, error: str | None = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error,
+                 now, now + self.ttl_seconds, job_id),
+            )
+
+    def add_sub_answer(self, job_id: str, answer: dict) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT sub_answers FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            sub_answers = json.loads(row[0]) + [answer]
+            conn.execute(
+                "UPDATE jobs SET sub_answers = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+                (json.dumps(sub_answers, default=str), now, now + self.ttl_seconds, job_id),
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        """Returns the job as a dict, or None if it does not exist or has expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, question, status, sub_answers, result, error, created_at, updated_at FROM jobs "
+                "WHERE id = ? AND expires_at >= ?",
+                (job_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "question": row[1],
+            "status": row[2],
+            "sub_answers": json.loads(row[3]),
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+
+class JobRunner:
+    """Runs jobs on a bounded pool of worker threads with a bounded number of pending jobs."""
+
+    def __init__(self, store: JobStore, workers: int, max_pending: int):
+        self.store = store
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, question: str, fn: Callable[[str, Callable[[dict], None]], dict]) -> str:
+        """
+        Queues `fn(question, on_sub_answer)` and returns the job ID.
+
+        `on_sub_answer` records partial answers as they complete. Raises
+        JobQueueFull when `max_pending` jobs are already queued or running.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+        try:
+            job_id = self.store.create(question)
+            self._executor.submit(self._run, job_id, question, fn)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, question: str, fn) -> None:
+        try:
+            self.store.update(job_id, "running")
+            result = fn(question, lambda answer: self.store.add_sub_answer(job_id, answer))
+            self.store.update(job_id, "succeeded", result=result)
+        except Exception as e:
+            self.store.update(job_id, "failed", error=str(getattr(e, "detail", e)))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
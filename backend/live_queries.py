@@ -0,0 +1,248 @@
+# live_queries.py
+"""
+Incrementally refreshed ("live") queries for dashboards.
+
+A live query stores its last result together with the `juld` high-water mark
+it covers. A refresh only reads rows with `juld` in (watermark, new max] and
+merges them into the stored result:
+
+- "append": plain row selections; new rows are appended.
+- "reaggregate": SUM/COUNT/MIN/MAX, optionally grouped; partial aggregates
+  are combined per group.
+- "distinct": GROUP BY without aggregates; new groups are unioned in.
+- "full": anything else is re-run over all history.
+
+Rows with a NULL juld can never be refreshed, so live queries ignore them.
+Registered queries live in a private SQLite file (`LiveQueryStore`), so they
+survive cache eviction and are shared by every worker on the host.
+"""
+
+import pickle
+import re
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable
+
+import pandas as pd
+from sqlalchemy import text
+
+from cache import ensure_private
+from sql_text import normalize_sql, split_top_level, strip_comments
+
+_QUERY_RE = re.compile(
+    r"^SELECT\s+(?P<select>.+?)\s+FROM\s+argo_data"
+    r"(?P<rest>(?:\s+(?:WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING)\b.*)?)$",
+    re.IGNORECASE,
+)
+_ITEM_RE = re.compile(r"^(?P<expr>.+?)(?:\s+(?:AS\s+)?(?P<alias>\w+))?$", re.IGNORECASE)
+_MERGEABLE_AGG_RE = re.compile(r"^(SUM|COUNT|MIN|MAX)\(\s*(?!DISTINCT\b)[^()]*\)$", re.IGNORECASE)
+_ANY_AGG_RE = re.compile(r"\b(AVG|SUM|COUNT|MIN|MAX|STDDEV\w*|VARIANCE|ARRAY_AGG|STRING_AGG|PERCENTILE\w*)\s*\(", re.IGNORECASE)
+_ORDER_ITEM_RE = re.compile(r"^(?P<column>\w+)(?:\s+(?P<direction>ASC|DESC))?$", re.IGNORECASE)
+# COUNT partials are summed when merged.
+_MERGE_FUNCTIONS = {"SUM": "sum", "COUNT": "sum", "MIN": "min", "MAX": "max"}
+
+
+@dataclass
+class LiveQuery:
+    id: str
+    question: str
+    sql_query: str
+    mode: str
+    group_columns: list[str] = field(default_factory=list)
+    aggregates: dict[str, str] = field(default_factory=dict)
+    order_by: list[tuple[str, bool]] = field(default_factory=list)
+    watermark: datetime | None = None
+    result: pd.DataFrame | None = None
+    refreshed_at: datetime | None = None
+
+
+def _clause(rest: str, keyword: str) -> str | None:
+    match = re.search(rf"\b{keyword}\s+(.+?)(?=\s+(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING)\b|$)", rest, re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def _groups_match_columns(group_items: list[str], selected: list[set[str]]) -> bool:
+    """True if GROUP BY names exactly the selected non-aggregate columns (by expression or alias)."""
+    matched = set()
+    for item in group_items:
+        item = item.lower()
+        position = next((i for i, names in enumerate(selected) if item in names), None)
+        if position is None:
+            return False
+        matched.add(position)
+    return len(matched) == len(selected)
+
+
+def plan_live_query(sql_query: str) -> tuple[str, list[str], dict[str, str], list[tuple[str, bool]]]:
+    """Classifies a query as append/reaggregate/distinct/full and returns (mode, group columns, aggregates, order by)."""
+    sql = normalize_sql(sql_query)
+    match = _QUERY_RE.match(sql)
+    if not match or len(re.findall(r"\bargo_data\b", sql, re.IGNORECASE)) != 1:
+        return "full", [], {}, []
+    select, rest = match["select"], match["rest"]
+    if re.match(r"DISTINCT\b", select, re.IGNORECASE) or re.search(r"\b(LIMIT|HAVING|OVER)\b", sql, re.IGNORECASE):
+        return "full", [], {}, []
+
+    order_by = []
+    order = _clause(rest, r"ORDER\s+BY")
+    if order:
+        for item in split_top_level(order):
+            parsed = _ORDER_ITEM_RE.match(item)
+            # Positional items (ORDER BY 2) can't be re-applied to a merged result by name.
+            if not parsed or parsed["column"].isdigit():
+                return "full", [], {}, []
+            order_by.append((parsed["column"], (parsed["direction"] or "ASC").upper() == "ASC"))
+
+    columns, selected, aggregates = [], [], {}
+    for item in split_top_level(select):
+        parsed = _ITEM_RE.match(item)
+        expr, alias = parsed["expr"].strip(), parsed["alias"]
+        aggregate = _MERGEABLE_AGG_RE.match(expr)
+        if aggregate:
+            aggregates[alias or aggregate[1].lower()] = _MERGE_FUNCTIONS[aggregate[1].upper()]
+        elif _ANY_AGG_RE.search(expr):
+            return "full", [], {}, []
+        elif alias or re.fullmatch(r"\w+|\*", expr):
+            columns.append(alias or expr)
+            selected.append({expr.lower(), (alias or expr).lower()})
+        else:
+            return "full", [], {}, []
+
+    group = _clause(rest, r"GROUP\s+BY")
+    grouped = group is not None
+    if grouped and not _groups_match_columns(split_top_level(group), selected):
+        return "full", [], {}, []
+    if not aggregates:
+        return ("distinct", columns, {}, order_by) if grouped else ("append", [], {}, order_by)
+    return "reaggregate", columns, aggregates, order_by
+
+
+def delta_sql(sql_query: str, since: datetime | None, until: datetime) -> str:
+    """
+    Rewrites the query to read only argo_data rows with juld in (since, until].
+
+    Comments are removed but line breaks kept, so the rewritten query runs with
+    the same clauses as the original.
+    """
+    window = f"juld <= '{until.isoformat()}'::timestamp"
+    if since is not None:
+        window = f"juld > '{since.isoformat()}'::timestamp AND {window}"
+    return re.sub(
+        r"\bFROM\s+argo_data\b",
+        f"FROM (SELECT * FROM argo_data WHERE {window}) AS argo_data",
+        strip_comments(sql_query).strip().rstrip(";").strip(),
+        count=1,
+        flags=re.IGNORECASE,
+    )
+
+
+def _sorted(live: LiveQuery, df: pd.DataFrame) -> pd.DataFrame:
+    order = [(c, asc) for c, asc in live.order_by if c in df.columns]
+    if not order:
+        return df.reset_index(drop=True)
+    return df.sort_values([c for c, _ in order], ascending=[a for _, a in order], kind="stable").reset_index(drop=True)
+
+
+def merge_result(live: LiveQuery, delta: pd.DataFrame) -> pd.DataFrame:
+    """Merges rows computed over the new juld window into the stored result."""
+    if live.result is None or live.mode == "full":
+        return delta
+    combined = pd.concat([live.result, delta], ignore_index=True)
+    if live.mode == "append":
+        return _sorted(live, combined)
+    if live.mode == "distinct":
+        return _sorted(live, combined.drop_duplicates())
+
+    def combine(how: str):
+        # min_count keeps SQL semantics: the SUM of no values is NULL, not 0.
+        return (lambda s: s.sum(min_count=1)) if how == "sum" else how
+
+    agg = {col: combine(how) for col, how in live.aggregates.items()}
+    if live.group_columns:
+        merged = combined.groupby(live.group_columns, dropna=False, sort=False).agg(agg).reset_index()
+    else:
+        merged = combined.agg(agg).to_frame().T.astype(live.result.dtypes.to_dict(), errors="ignore")
+    return _sorted(live, merged[list(live.result.columns)])
+
+
+def read_watermark(engine) -> datetime | None:
+    """Current MAX(juld), read directly so it is never served from a cache."""
+    with engine.connect() as connection:
+        value = connection.execute(text("SELECT MAX(juld) FROM argo_data")).scalar()
+    return pd.Timestamp(value).to_pydatetime() if value is not None else None
+
+
+def build_watermark_index(engine) -> None:
+    """Index on juld so watermark reads and delta windows avoid full scans."""
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS argo_data_juld_idx ON argo_data (juld)"))
+
+
+class LiveQueryStore:
+    """
+    SQLite-backed live queries; idle queries expire `ttl_seconds` after their last refresh.
+
+    Queries (with their stored results) are pickled, so the file must be private
+    to this service; `ensure_private` refuses paths other users could write.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int):
+        ensure_private(path)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS live_queries (id TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, question: str, sql_query: str) -> LiveQuery:
+        mode, group_columns, aggregates, order_by = plan_live_query(sql_query)
+        return LiveQuery(uuid.uuid4().hex, question, sql_query, mode, group_columns, aggregates, order_by)
+
+    def get(self, live_query_id: str) -> LiveQuery | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM live_queries WHERE id = ? AND expires_at >= ?", (live_query_id, time.time())
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def save(self, live: LiveQuery) -> None:
+        """Stores the query and its result. Also drops expired queries."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM live_queries WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO live_queries (id, value, expires_at) VALUES (?, ?, ?)",
+                (live.id, pickle.dumps(live, protocol=pickle.HIGHEST_PROTOCOL), now + self.ttl_seconds),
+            )
+
+
+def refresh(live: LiveQuery, engine, run_query: Callable[[str], pd.DataFrame]) -> int:
+    """
+    Brings a live query up to the current watermark and returns the number of new rows read.
+
+    The first refresh computes the full result; later ones only read rows newer
+    than the stored watermark, unless the query is in "full" mode.
+    """
+    watermark = read_watermark(engine)
+    if watermark is None:
+        live.result, live.watermark = run_query(live.sql_query), None
+        live.refreshed_at = datetime.now(timezone.utc)
+        return len(live.result)
+    if live.result is not None and live.watermark is not None and watermark <= live.watermark:
+        live.refreshed_at = datetime.now(timezone.utc)
+        return 0
+
+    since = live.watermark if live.mode != "full" and live.result is not None else None
+    delta = run_query(delta_sql(live.sql_query, since, watermark))
+    live.result = merge_result(live, delta) if since is not None else delta
+    live.watermark = watermark
+    live.refreshed_at = datetime.now(timezone.utc)
+    return len(delta)
@@ -0,0 +1,120 @@
+# regions.py
+"""
+Spatial bucketing of argo_data and a catalog of named ocean regions.
+
+Every measurement gets a `cell_id` for its 1-degree lat/lon grid cell (the same
+grid as the aggregate cube). Named regions are stored as sets of cell IDs in
+`argo_region_cells`, so regional questions become indexed lookups with the
+same boundaries every time instead of lat/lon boxes guessed by the LLM.
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from data_cube import CELL_DEGREES
+
+REGION_CELLS_TABLE = "argo_region_cells"
+LAT_CELLS = int(180 / CELL_DEGREES)
+LON_CELLS = int(360 / CELL_DEGREES)
+
+
+@dataclass(frozen=True)
+class Region:
+    key: str
+    name: str
+    aliases: tuple[str, ...]
+    # (lat_min, lat_max, lon_min, lon_max) boxes on cell edges; max bounds are exclusive.
+    boxes: tuple[tuple[float, float, float, float], ...]
+
+
+REGIONS = {
+    region.key: region
+    for region in (
+        Region("equator", "Equatorial band", ("equator", "equatorial"), ((-5, 5, -180, 180),)),
+        Region("arabian_sea", "Arabian Sea", ("arabian sea",), ((5, 25, 50, 78),)),
+        Region("bay_of_bengal", "Bay of Bengal", ("bay of bengal",), ((5, 23, 78, 100),)),
+        Region("andaman_sea", "Andaman Sea", ("andaman sea",), ((5, 18, 92, 99),)),
+        Region("laccadive_sea", "Laccadive Sea", ("laccadive sea", "lakshadweep sea"), ((7, 14, 72, 78),)),
+        Region("red_sea", "Red Sea", ("red sea",), ((12, 30, 32, 44),)),
+        Region("persian_gulf", "Persian Gulf", ("persian gulf", "arabian gulf"), ((23, 31, 47, 57),)),
+        Region("indian_ocean", "Indian Ocean", ("indian ocean",), ((-60, 30, 20, 147),)),
+        Region("southern_ocean", "Southern Ocean", ("southern ocean", "antarctic ocean"), ((-90, -60, -180, 180),)),
+        Region("arctic_ocean", "Arctic Ocean", ("arctic ocean", "arctic"), ((66, 90, -180, 180),)),
+        Region("north_atlantic", "North Atlantic Ocean", ("north atlantic",), ((0, 66, -80, 0),)),
+        Region("south_atlantic", "South Atlantic Ocean", ("south atlantic",), ((-60, 0, -70, 20),)),
+        Region("atlantic_ocean", "Atlantic Ocean", ("atlantic ocean", "atlantic"), ((0, 66, -80, 0), (-60, 0, -70, 20))),
+        Region("north_pacific", "North Pacific Ocean", ("north pacific",), ((0, 66, 120, 180), (0, 66, -180, -100))),
+        Region("south_pacific", "South Pacific Ocean", ("south pacific",), ((-60, 0, 147, 180), (-60, 0, -180, -70))),
+        Region("pacific_ocean", "Pacific Ocean", ("pacific ocean", "pacific"),
+               ((0, 66, 120, 180), (0, 66, -180, -100), (-60, 0, 147, 180), (-60, 0, -180, -70))),
+        Region("mediterranean_sea", "Mediterranean Sea", ("mediterranean sea", "mediterranean"), ((30, 46, -6, 36),)),
+        Region("gulf_of_mexico", "Gulf of Mexico", ("gulf of mexico",), ((18, 31, -98, -80),)),
+        Region("caribbean_sea", "Caribbean Sea", ("caribbean sea", "caribbean"), ((9, 22, -88, -60),)),
+    )
+}
+
+# Longest aliases first so "north atlantic" wins over "atlantic".
+_ALIASES = sorted(((alias, key) for key, r in REGIONS.items() for alias in r.aliases), key=lambda a: -len(a[0]))
+
+
+def cell_ids(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Grid cell ID for each point, as floats with NaN where the position is missing."""
+    lat = np.clip(np.asarray(latitude, dtype=float), -90, 90 - 1e-9)
+    lon = np.mod(np.asarray(longitude, dtype=float) + 180, 360) - 180
+    row = np.floor((lat + 90) / CELL_DEGREES)
+    col = np.floor((lon + 180) / CELL_DEGREES)
+    return row * LON_CELLS + col
+
+
+def region_cells(region: Region) -> np.ndarray:
+    """All cell IDs covered by a region's boxes."""
+    cells = []
+    for lat_min, lat_max, lon_min, lon_max in region.boxes:
+        lat = np.arange(lat_min, lat_max, CELL_DEGREES)
+        lon = np.arange(lon_min, lon_max, CELL_DEGREES)
+        grid_lat, grid_lon = np.meshgrid(lat, lon, indexing="ij")
+        cells.append(cell_ids(grid_lat.ravel(), grid_lon.ravel()))
+    return np.unique(np.concatenate(cells)).astype(int)
+
+
+def resolve_regions(question: str) -> list[Region]:
+    """Named regions mentioned in the question, ignoring aliases inside longer matches."""
+    lowered, taken, found = question.lower(), [], []
+    for alias, key in _ALIASES:
+        for match in re.finditer(rf"\b{re.escape(alias)}\b", lowered):
+            span = range(match.start(), match.end())
+            if any(set(span) & set(other) for other in taken):
+                continue
+            taken.append(span)
+            if REGIONS[key] not in found:
+                found.append(REGIONS[key])
+    return found
+
+
+def region_predicate(region: Region) -> str:
+    """SQL condition restricting argo_data rows to a named region via the indexed cell_id column."""
+    return f"cell_id IN (SELECT cell_id FROM {REGION_CELLS_TABLE} WHERE region = '{region.key}')"
+
+
+def describe_regions(regions: list[Region]) -> str:
+    """Prompt text mapping the regions named in a question to their SQL predicates."""
+    if not regions:
+        return "No named regions detected in the question."
+    return "\n".join(f"- {r.name}: `{region_predicate(r)}`" for r in regions)
+
+
+def build_region_index(engine) -> None:
+    """Indexes argo_data.cell_id and (re)creates the named-region cell catalog table."""
+    catalog = pd.DataFrame(
+        [(key, int(cell)) for key, region in REGIONS.items() for cell in region_cells(region)],
+        columns=["region", "cell_id"],
+    )
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS argo_data_cell_id_idx ON argo_data (cell_id)"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {REGION_CELLS_TABLE}"))
+        catalog.to_sql(REGION_CELLS_TABLE, con=connection, index=False, chunksize=5000)
+        connection.execute(text(f"ALTER TABLE {REGION_CELLS_TABLE} ADD PRIMARY KEY (region, cell_id)"))
@@ -0,0 +1,100 @@
+# retrieval.py
+"""
+Hybrid retrieval over per-float summary documents.
+
+An in-memory inverted index maps platform numbers, active years and named
+regions to floats. Questions naming a platform number are answered by exact
+lookup; year/region terms narrow candidates by keyword; embedding search is
+only used to fill in when the keyword index has nothing (or not enough).
+When more floats match than documents are wanted, a single aggregate
+description is returned instead of an arbitrary subset of floats.
+"""
+
+import re
+from collections import defaultdict
+from typing import Callable
+
+import pandas as pd
+
+from float_documents import format_float_document
+from regions import REGIONS, resolve_regions
+
+PLATFORM_RE = re.compile(r"\b\d{5,8}\b")
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+def _overlaps(row, box) -> bool:
+    lat_min, lat_max, lon_min, lon_max = box
+    return (row["min_lat"] < lat_max and row["max_lat"] >= lat_min
+            and row["min_lon"] < lon_max and row["max_lon"] >= lon_min)
+
+
+class HybridRetriever:
+    """Exact and keyword lookups over float summaries, with vector search as a fallback."""
+
+    def __init__(self, summaries: pd.DataFrame):
+        self.documents: dict[str, str] = {}
+        self.summaries: dict[str, dict] = {}
+        self.by_year: dict[str, set[str]] = defaultdict(set)
+        self.by_region: dict[str, set[str]] = defaultdict(set)
+        for _, row in summaries.iterrows():
+            platform = str(row["platform_number"]).strip()
+            self.documents[platform] = format_float_document(row)
+            self.summaries[platform] = row.to_dict()
+            first_seen, last_seen = pd.Timestamp(row["first_seen"]), pd.Timestamp(row["last_seen"])
+            if not (pd.isna(first_seen) or pd.isna(last_seen)):  # Floats with no dated profiles have no years
+                for year in range(first_seen.year, last_seen.year + 1):
+                    self.by_year[str(year)].add(platform)
+            for key, region in REGIONS.items():
+                if any(_overlaps(row, box) for box in region.boxes):
+                    self.by_region[key].add(platform)
+
+    def keyword_matches(self, question: str) -> list[str]:
+        """Floats active in every year and region named in the question (years/regions are OR'ed within a group)."""
+        groups = []
+        years = YEAR_RE.findall(question)
+        if years:
+            groups.append(set().union(*(self.by_year.get(y, set()) for y in years)))
+        regions = resolve_regions(question)
+        if regions:
+            groups.append(set().union(*(self.by_region.get(r.key, set()) for r in regions)))
+        if not groups:
+            return []
+        # Floats with the most cycles first.
+        return sorted(set.intersection(*groups), key=lambda p: (-(self.summaries[p]["total_cycles"] or 0), p))
+
+    def describe_matches(self, question: str, platforms: list[str]) -> str:
+        """One document summarizing many keyword matches, so no arbitrary floats are singled out."""
+        terms = YEAR_RE.findall(question) + [r.name for r in resolve_regions(question)]
+        rows = pd.DataFrame([self.summaries[p] for p in platforms])
+        return (
+            f"{len(platforms)} ARGO floats match {', '.join(terms)}, with "
+            f"{int(rows['total_cycles'].fillna(0).sum())} cycles recorded between {rows['first_seen'].min()} "
+            f"and {rows['last_seen'].max()}. No individual float is implied by the question, so do not filter "
+            f"on platform_number."
+        )
+
+    def search(self, question: str, vector_search: Callable[[int], list[str]] | None = None, k: int = 3) -> list[str]:
+        """
+        Returns up to `k` documents relevant to the question.
+
+        Exact platform-number matches are returned directly. Otherwise keyword
+        matches come first (or one aggregate description if there are more
+        than `k`) and `vector_search(n)`, if given, fills the rest.
+        """
+        exact = [self.documents[p] for p in PLATFORM_RE.findall(question) if p in self.documents]
+        if exact:
+            return exact
+
+        matches = self.keyword_matches(question)
+        if len(matches) > k:
+            results = [self.describe_matches(question, matches)]
+        else:
+            results = [self.documents[p] for p in matches]
+        if len(results) < k and vector_search is not None:
+            for doc in vector_search(k):
+                if doc not in results:
+                    results.append(doc)
+                if len(results) == k:
+                    break
+        return results
@@ -0,0 +1,63 @@
+# singleflight.py
+"""
+Request coalescing: concurrent calls with the same key run the work once.
+
+The first caller for a key (the leader) executes the function; callers that
+arrive while it is in flight block until it finishes and receive the same
+result, or the same exception. Nothing is cached after the call completes.
+"""
+
+import threading
+from typing import Any, Callable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key across threads."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Runs `fn` unless a call for `key` is already in flight, in which case waits for it.
+
+        Results are shared between callers and must be treated as read-only.
+        Any exception raised by the leader, including cancellation-style
+        BaseExceptions, is re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed."""
+        with self._lock:
+            return len(self._calls)
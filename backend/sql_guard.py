@@ -0,0 +1,130 @@
+# sql_guard.py
+"""
+In-process parse, validation and canonicalization of generated SQL.
+
+`check_sql` parses a query with sqlglot (PostgreSQL dialect) and rejects
+anything that is not a single read-only SELECT over known tables and columns
+(no row locks, SELECT INTO or server-administration functions), so bad LLM
+output fails fast without a database round trip. The validated query is
+executed exactly as written, never reformatted. A separate canonical form
+(normalized formatting, sorted AND conditions and IN lists, literals extracted
+as parameters) gives a key that is stable across cosmetic differences and is
+used for caching and request coalescing.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+
+from sql_text import normalize_sql
+
+_WRITE_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter, exp.Command,
+                exp.Into, exp.Lock)
+# Functions that change session state, signal backends, sleep, or touch the server's files.
+_UNSAFE_FUNCTION_RE = re.compile(
+    r"^(pg_\w+|lo_\w+|dblink\w*|set_config|current_setting|nextval|setval|txid_\w+|query_to_xml\w*)$",
+    re.IGNORECASE,
+)
+
+
+class InvalidSQL(ValueError):
+    """Raised when a query cannot be parsed or is not allowed to run."""
+
+
+@dataclass(frozen=True)
+class CheckedSQL:
+    sql: str  # The validated query, as it will be executed
+    canonical: str  # Canonical template with literals replaced by placeholders
+    params: tuple  # Literals extracted from the canonical template as SQL source text, in order
+
+    @property
+    def key(self) -> str:
+        """Stable identity of the query for caching and deduplication."""
+        return f"{self.canonical} -- {json.dumps(self.params)}"
+
+
+def _validate(tree: exp.Expression, schema: dict[str, set[str]]) -> None:
+    if not isinstance(tree, (exp.Select, exp.SetOperation)):
+        raise InvalidSQL(f"Only SELECT queries are allowed, got {tree.key.upper()}.")
+    for node in tree.walk():
+        if isinstance(node, _WRITE_NODES):
+            raise InvalidSQL(f"Statements that modify data or lock rows are not allowed ({node.key.upper()}).")
+        if isinstance(node, exp.Func):
+            name = node.name if isinstance(node, exp.Anonymous) else node.sql_name()
+            if _UNSAFE_FUNCTION_RE.match(name):
+                raise InvalidSQL(f"Function '{name}' is not allowed.")
+    if not schema:
+        return
+
+    cte_names = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+    for table in tree.find_all(exp.Table):
+        if table.name not in schema and table.name not in cte_names:
+            raise InvalidSQL(f"Unknown table '{table.name}'. Known tables: {', '.join(sorted(schema))}.")
+
+    referenced = {t.name for t in tree.find_all(exp.Table) if t.name in schema}
+    known_columns = set().union(*(schema[t] for t in referenced)) if referenced else set()
+    # Output aliases can be referenced in ORDER BY/GROUP BY and from outer queries.
+    known_columns |= {a.alias for a in tree.find_all(exp.Alias)}
+    known_columns |= {c.name for t in tree.find_all(exp.TableAlias) for c in t.columns}
+    for column in tree.find_all(exp.Column):
+        if column.name and column.name != "*" and column.name not in known_columns:
+            raise InvalidSQL(f"Unknown column '{column.name}'.")
+
+
+def _canonicalize(tree: exp.Expression) -> tuple[str, tuple]:
+    # Lowercases unquoted identifiers only: "Temp" and temp are different columns.
+    tree = normalize_identifiers(tree.copy(), dialect="postgres")
+    for in_node in tree.find_all(exp.In):
+        values = in_node.expressions
+        if values and all(isinstance(v, exp.Literal) for v in values):
+            in_node.set("expressions", sorted(values, key=lambda v: (v.is_string, v.this)))
+    for where in tree.find_all(exp.Where):
+        if isinstance(where.this, exp.And):
+            conjuncts = sorted(where.this.flatten(), key=lambda c: c.sql(dialect="postgres"))
+            where.set("this", exp.and_(*conjuncts, copy=False))
+
+    params = []
+
+    def extract(node):
+        if isinstance(node, exp.Literal):
+            # Source text, not a parsed value: 1 and 1.0 (integer vs numeric) and 1 and '1' differ.
+            params.append(node.sql(dialect="postgres"))
+            return exp.Placeholder()
+        return node
+
+    template = tree.transform(extract, copy=False).sql(dialect="postgres", comments=False)
+    return template, tuple(params)
+
+
+def check_sql(sql: str, schema: dict[str, set[str]]) -> CheckedSQL:
+    """
+    Parses and validates a query against `schema` ({table: columns}).
+
+    Raises InvalidSQL with a message suitable for feeding back to the LLM.
+    An empty schema skips the table/column checks. The returned `sql` keeps the
+    original text (line breaks and comments included), minus a trailing semicolon.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except ParseError as e:
+        details = "; ".join(f"{err['description']} (line {err['line']}, column {err['col']})" for err in e.errors)
+        raise InvalidSQL(f"Syntax error: {details or e}") from e
+    if len(statements) != 1:
+        raise InvalidSQL(f"Expected exactly one SQL statement, got {len(statements)}.")
+    _validate(statements[0], schema)
+    canonical, params = _canonicalize(statements[0])
+    return CheckedSQL(sql, canonical, params)
+
+
+def canonical_key(sql: str) -> str:
+    """Canonical key for any query; falls back to whitespace normalization if it cannot be parsed."""
+    try:
+        return check_sql(sql, {}).key
+    except InvalidSQL:
+        return normalize_sql(sql)
@@ -0,0 +1,60 @@
+# sql_text.py
+"""Small text helpers for the SQL strings produced by the LLM."""
+
+import re
+
+
+def strip_comments(sql: str) -> str:
+    """Replaces `--` and `/* */` comments outside quotes with a space."""
+    out, i, quote = [], 0, None
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            out.append(" ")
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+            out.append(" ")
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Collapses whitespace and strips comments and the trailing semicolon from a SQL string.
+
+    Comments are removed first, so a `--` comment cannot swallow the rest of the
+    query once it is on one line. The result is for matching and keys; execute
+    the original text.
+    """
+    return re.sub(r"\s+", " ", strip_comments(sql)).strip().rstrip(";").strip()
+
+
+def split_top_level(text: str, separator: str = ",") -> list[str]:
+    """Splits on a separator that is not inside parentheses or quotes."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, i):
+            parts.append(text[start:i].strip())
+            start = i + len(separator)
+    parts.append(text[start:].strip())
+    return parts
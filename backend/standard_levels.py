@@ -0,0 +1,111 @@
+# standard_levels.py
+"""
+Profiles interpolated to standard depth levels.
+
+`interpolate_profiles` linearly interpolates every (platform_number,
+cycle_number) profile onto STANDARD_LEVELS, vectorized across a batch of
+profiles at a time. `build_standard_levels` writes the result to
+`argo_standard_levels`, indexed by level, so depth-slice questions become
+indexed lookups with consistent answers instead of ad-hoc pressure windows.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+STANDARD_LEVELS_TABLE = "argo_standard_levels"
+# Standard depth levels in dbar (~ metres).
+STANDARD_LEVELS = (5, 10, 20, 30, 50, 75, 100, 125, 150, 200, 250, 300, 400, 500, 600, 700,
+                   800, 900, 1000, 1100, 1200, 1300, 1400, 1500, 1750, 2000)
+LEVEL_VARIABLES = ("temperature", "salinity")
+PROFILE_KEYS = ["platform_number", "cycle_number"]
+# Don't interpolate across gaps between measurements wider than this (dbar).
+MAX_GAP_DBAR = 300.0
+BATCH_PROFILES = 10000
+# Pressure offset separating profiles on one sorted axis; larger than any pressure.
+_PROFILE_SPAN = 100000.0
+
+
+def _interpolate_batch(profile: np.ndarray, pressure: np.ndarray, values: np.ndarray,
+                       query_profile: np.ndarray, query_level: np.ndarray) -> np.ndarray:
+    """
+    Interpolates sorted (profile, pressure) samples at (query_profile, query_level) points.
+
+    Profiles are laid end to end on a single axis (profile * span + pressure), so
+    one searchsorted finds the bracketing samples for every query at once.
+    """
+    result = np.full(len(query_profile), np.nan)
+    if len(values) == 0:
+        return result
+    axis = profile * _PROFILE_SPAN + pressure
+    query = query_profile * _PROFILE_SPAN + query_level
+    hi = np.searchsorted(axis, query, side="left")
+    in_range = hi < len(axis)
+    hi_c = np.minimum(hi, len(axis) - 1)
+
+    exact = in_range & (axis[hi_c] == query)
+    result[exact] = values[hi_c[exact]]
+
+    lo = hi_c - 1
+    between = (in_range & ~exact & (hi > 0)
+               & (profile[hi_c] == query_profile) & (profile[np.maximum(lo, 0)] == query_profile)
+               & (pressure[hi_c] - pressure[np.maximum(lo, 0)] <= MAX_GAP_DBAR))
+    lo_b, hi_b = lo[between], hi_c[between]
+    weight = (query_level[between] - pressure[lo_b]) / (pressure[hi_b] - pressure[lo_b])
+    result[between] = values[lo_b] + weight * (values[hi_b] - values[lo_b])
+    return result
+
+
+def interpolate_profiles(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns one row per profile and standard level with interpolated LEVEL_VARIABLES."""
+    variables = [v for v in LEVEL_VARIABLES if v in df.columns]
+    df = df[df["pressure"].notna()].sort_values(PROFILE_KEYS + ["pressure"], kind="stable")
+    profile_ids = df.groupby(PROFILE_KEYS, sort=False, dropna=False).ngroup().to_numpy()
+    meta_columns = PROFILE_KEYS + [c for c in ("juld", "latitude", "longitude", "cell_id") if c in df.columns]
+    meta = df[meta_columns].groupby(profile_ids, sort=True).first()
+
+    levels = np.asarray(STANDARD_LEVELS, dtype=float)
+    pressure = df["pressure"].to_numpy(dtype=float)
+    value_arrays = {v: df[v].to_numpy(dtype=float) for v in variables}
+    frames = []
+    for start in range(0, len(meta), BATCH_PROFILES):
+        batch_ids = meta.index.to_numpy()[start:start + BATCH_PROFILES]
+        rows = (profile_ids >= batch_ids[0]) & (profile_ids <= batch_ids[-1])
+        query_profile = np.repeat(batch_ids, len(levels)).astype(float)
+        query_level = np.tile(levels, len(batch_ids))
+        batch = pd.DataFrame({"profile": query_profile.astype(int), "pressure_level": query_level.astype(int)})
+        for variable in variables:
+            usable = rows & np.isfinite(value_arrays[variable])
+            batch[variable] = _interpolate_batch(
+                profile_ids[usable].astype(float), pressure[usable], value_arrays[variable][usable],
+                query_profile, query_level,
+            )
+        frames.append(batch.dropna(subset=variables, how="all"))
+
+    if not frames:
+        return pd.DataFrame(columns=meta_columns + ["pressure_level"] + variables)
+    levels_df = pd.concat(frames, ignore_index=True)
+    levels_df = levels_df.join(meta, on="profile").drop(columns="profile")
+    return levels_df[meta_columns + ["pressure_level"] + variables]
+
+
+def build_standard_levels(df: pd.DataFrame, engine) -> int:
+    """(Re)creates the standard-level table from raw measurements and returns its row count."""
+    levels_df = interpolate_profiles(df)
+    levels_df.to_sql(STANDARD_LEVELS_TABLE, con=engine, if_exists="replace", index=False, chunksize=1000)
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE INDEX ON {STANDARD_LEVELS_TABLE} (pressure_level, juld)"))
+        connection.execute(text(f"CREATE INDEX ON {STANDARD_LEVELS_TABLE} (platform_number, cycle_number)"))
+    return len(levels_df)
+
+
+def describe_standard_levels() -> str:
+    """Prompt text advertising the standard-level table to the SQL generator."""
+    levels = ", ".join(str(level) for level in STANDARD_LEVELS)
+    return (
+        f"There is also a table '{STANDARD_LEVELS_TABLE}' with one row per profile (platform_number, cycle_number) "
+        f"and standard depth level `pressure_level` (dbar, ~metres), with temperature and salinity linearly "
+        f"interpolated, plus the profile's juld, latitude, longitude and cell_id. Levels: {levels}. "
+        f"For questions about a specific depth (e.g. 'temperature at 1000 m') or depth sections, query this table "
+        f"with `pressure_level = <nearest level>` instead of filtering raw pressure in argo_data."
+    )
@@ -0,0 +1,162 @@
+# trajectories.py
+"""
+Precomputed float trajectories for the map.
+
+At load time each float's per-cycle positions are simplified with
+Ramer-Douglas-Peucker at several zoom-level tolerances into
+`argo_trajectories` (the highest zoom keeps every cycle). The API then serves
+complete tracks as small, pre-simplified responses instead of raw measurement
+rows.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+TRAJECTORIES_TABLE = "argo_trajectories"
+PROFILE_KEYS = ["platform_number", "cycle_number"]
+# Map zoom level -> simplification tolerance in degrees (0 keeps every position).
+ZOOM_TOLERANCES = {2: 0.5, 4: 0.1, 6: 0.02, 8: 0.0}
+COORDINATE_DECIMALS = 4
+
+
+def resolve_zoom(zoom: int) -> int:
+    """The highest precomputed zoom level not above the requested one."""
+    levels = sorted(ZOOM_TOLERANCES)
+    return max((level for level in levels if level <= zoom), default=levels[0])
+
+
+def simplify(lat: np.ndarray, lon: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the points kept by Ramer-Douglas-Peucker line simplification."""
+    n = len(lat)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        x, y = lon[start + 1:end], lat[start + 1:end]
+        dx, dy = lon[end] - lon[start], lat[end] - lat[start]
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            distance = np.hypot(x - lon[start], y - lat[start])
+        else:
+            distance = np.abs(dy * (x - lon[start]) - dx * (y - lat[start])) / norm
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.extend([(start, split), (split, end)])
+    return np.flatnonzero(keep)
+
+
+def longitude_extent(lon: np.ndarray) -> tuple[float, float]:
+    """
+    The narrowest (min_lon, max_lon) interval covering all longitudes.
+
+    When that interval crosses the antimeridian (a track going 179 -> -179)
+    it is returned wrapped, with min_lon > max_lon, as for query bboxes.
+    """
+    values = np.unique(lon)
+    if len(values) == 1:
+        return float(values[0]), float(values[0])
+    # The interval is the complement of the widest gap between neighbouring longitudes on the circle.
+    gaps = np.append(np.diff(values), values[0] + 360 - values[-1])
+    widest = int(np.argmax(gaps))
+    if widest == len(values) - 1:
+        return float(values[0]), float(values[-1])
+    return float(values[widest + 1]), float(values[widest])
+
+
+def profile_positions(df: pd.DataFrame) -> pd.DataFrame:
+    """One position per profile (platform_number, cycle_number), in track order."""
+    positions = (
+        df.dropna(subset=["latitude", "longitude"])
+        .groupby(PROFILE_KEYS, as_index=False)
+        .agg(juld=("juld", "min"), latitude=("latitude", "first"), longitude=("longitude", "first"))
+    )
+    return positions.sort_values(["platform_number", "juld", "cycle_number"], kind="stable").reset_index(drop=True)
+
+
+def simplified_tracks(positions: pd.DataFrame) -> pd.DataFrame:
+    """One row per float and zoom level with its simplified track as JSON."""
+    rows = []
+    for platform, track in positions.groupby("platform_number", sort=False):
+        lat = track["latitude"].to_numpy(dtype=float)
+        lon = track["longitude"].to_numpy(dtype=float)
+        cycles = track["cycle_number"].to_numpy()
+        min_lon, max_lon = longitude_extent(lon)
+        for zoom, tolerance in ZOOM_TOLERANCES.items():
+            kept = simplify(lat, lon, tolerance)
+            rows.append({
+                "platform_number": platform,
+                "zoom": zoom,
+                "n_points": len(kept),
+                "total_points": len(track),
+                "min_lat": lat.min(), "max_lat": lat.max(),
+                "min_lon": min_lon, "max_lon": max_lon,
+                # [lat, lon] pairs, the order Leaflet expects.
+                "coordinates": json.dumps(np.round(np.column_stack([lat[kept], lon[kept]]), COORDINATE_DECIMALS).tolist()),
+                "cycles": json.dumps([int(c) for c in cycles[kept]]),
+            })
+    return pd.DataFrame(rows)
+
+
+def build_trajectories(df: pd.DataFrame, engine) -> int:
+    """(Re)creates the simplified-trajectory table; returns the number of floats."""
+    tracks = simplified_tracks(profile_positions(df))
+    tracks.to_sql(TRAJECTORIES_TABLE, con=engine, if_exists="replace", index=False, chunksize=1000)
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE UNIQUE INDEX ON {TRAJECTORIES_TABLE} (platform_number, zoom)"))
+        connection.execute(text(f"CREATE INDEX ON {TRAJECTORIES_TABLE} (zoom, min_lat, max_lat)"))
+    return tracks["platform_number"].nunique() if len(tracks) else 0
+
+
+def _track_payload(row) -> dict:
+    return {
+        "platform_number": row["platform_number"],
+        "zoom": int(row["zoom"]),
+        "n_points": int(row["n_points"]),
+        "total_points": int(row["total_points"]),
+        "bbox": [row["min_lon"], row["min_lat"], row["max_lon"], row["max_lat"]],
+        "coordinates": json.loads(row["coordinates"]),
+        "cycles": json.loads(row["cycles"]),
+    }
+
+
+def fetch_trajectory(engine, platform_number: str, zoom: int) -> dict | None:
+    """The simplified track of one float at a precomputed zoom level, or None if unknown."""
+    query = text(f"SELECT * FROM {TRAJECTORIES_TABLE} WHERE platform_number = :platform_number AND zoom = :zoom")
+    with engine.connect() as connection:
+        row = connection.execute(query, {"platform_number": platform_number, "zoom": zoom}).mappings().first()
+    return _track_payload(row) if row else None
+
+
+def fetch_trajectories_in_bbox(engine, bbox: tuple[float, float, float, float], zoom: int, limit: int) -> list[dict]:
+    """
+    Simplified tracks of floats whose extent intersects bbox (min_lon, min_lat, max_lon, max_lat).
+
+    A bbox, or a stored track extent, with min_lon > max_lon crosses the
+    antimeridian and stands for the two ranges [min_lon, 180] and [-180, max_lon].
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if min_lon <= max_lon:
+        lon_condition = ("((min_lon <= max_lon AND max_lon >= :min_lon AND min_lon <= :max_lon)"
+                         " OR (min_lon > max_lon AND (min_lon <= :max_lon OR max_lon >= :min_lon)))")
+    else:
+        # Two ranges that both contain the antimeridian always intersect.
+        lon_condition = "(min_lon > max_lon OR max_lon >= :min_lon OR min_lon <= :max_lon)"
+    query = text(
+        f"SELECT * FROM {TRAJECTORIES_TABLE} WHERE zoom = :zoom "
+        f"AND max_lat >= :min_lat AND min_lat <= :max_lat AND {lon_condition} "
+        "ORDER BY platform_number LIMIT :limit"
+    )
+    params = {"zoom": zoom, "min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon, "limit": limit}
+    with engine.connect() as connection:
+        rows = connection.execute(query, params).mappings().all()
+    return [_track_payload(row) for row in rows]
@@ -3,8 +3,16 @@
 import pandas as pd
 from sqlalchemy import create_engine
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from data_cube import CUBE_TABLE, build_cube
+from live_queries import build_watermark_index
+from regions import REGION_CELLS_TABLE, build_region_index, cell_ids
+from standard_levels import STANDARD_LEVELS_TABLE, build_standard_levels
+from trajectories import TRAJECTORIES_TABLE, build_trajectories
+
 load_dotenv()
 
 # --- DATABASE CONNECTION DETAILS ---
@@ -34,6 +42,9 @@ if 'platform_number' in df.columns and df['platform_number'].dtype == 'object':
 
 print(f"Successfully loaded {len(df)} rows.")
 
+# Spatial bucket for each measurement; indexed below for named-region lookups
+df['cell_id'] = pd.Series(cell_ids(df['latitude'].to_numpy(), df['longitude'].to_numpy()), index=df.index).astype('Int64')
+
 # Create the connection string for SQLAlchemy
 engine_string = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 engine = create_engine(engine_string)
@@ -51,4 +62,21 @@ df.to_sql(
     chunksize=1000
 )
 
-print("SUCCESS: Data has been loaded into the PostgreSQL database.")
\ No newline at end of file
+print("Indexing juld for incremental refreshes...")
+build_watermark_index(engine)
+
+print(f"Indexing cell_id and building named-region table '{REGION_CELLS_TABLE}'...")
+build_region_index(engine)
+
+print(f"Interpolating profiles to standard depth levels into '{STANDARD_LEVELS_TABLE}'...")
+level_rows = build_standard_levels(df, engine)
+print(f"Wrote {level_rows} standard-level rows.")
+
+print(f"Precomputing simplified float trajectories into '{TRAJECTORIES_TABLE}'...")
+float_count = build_trajectories(df, engine)
+print(f"Wrote trajectories for {float_count} floats.")
+
+print(f"Building pre-aggregated cube table '{CUBE_TABLE}'...")
+build_cube(engine)
+
+print("SUCCESS: Data has been loaded into the PostgreSQL database.")
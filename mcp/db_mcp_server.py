@@ -1,31 +1,213 @@
 # oceanGPT/mcp/db_mcp_server.py
 from mcp.server.fastmcp import FastMCP
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+import anyio
 import pandas as pd
+import json
 import os
+import re
+import threading
+import time
+from functools import wraps
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_USER = 'postgres'
+DB_USER = os.getenv('DB_USER', 'postgres')
 DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = 'localhost'
-DB_PORT = '5432'
-DB_NAME = 'argo_db'
+DB_HOST = os.getenv('DB_HOST', 'localhost')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('DB_NAME', 'argo_db')
 
+STATEMENT_TIMEOUT_MS = int(os.getenv("MCP_STATEMENT_TIMEOUT_MS", "15000"))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = int(os.getenv("MCP_MAX_PAGE_SIZE", "1000"))
+CACHE_TTL_SECONDS = int(os.getenv("MCP_CACHE_TTL_SECONDS", "600"))
+
+# Pooled, read-only engine: every session runs in read-only transactions with a
+# statement timeout, so agents cannot modify data or hold connections forever.
+# Both are re-applied on every checkout (see _reset_session), so a tool call that
+# changes them with set_config() cannot affect later callers on the same connection.
 engine_string = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(engine_string)
+engine = create_engine(
+    engine_string,
+    pool_size=int(os.getenv("MCP_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("MCP_POOL_OVERFLOW", "5")),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    connect_args={"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS} -c default_transaction_read_only=on"},
+)
+
+
+@event.listens_for(engine, "checkout")
+def _reset_session(dbapi_connection, connection_record, connection_proxy):
+    """Restores read-only mode and the statement timeout before a pooled connection is handed out."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("RESET ALL")
+        cursor.execute(f"SET statement_timeout = {STATEMENT_TIMEOUT_MS}")
+        cursor.execute("SET default_transaction_read_only = on")
+    finally:
+        cursor.close()
+    dbapi_connection.commit()
+
 
 mcp = FastMCP("ArgoDBTools")
 
-@mcp.tool()
-def run_sql(query: str) -> dict:
-    """Execute SQL query on argo_data and return up to 100 rows."""
+READ_ONLY_START = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def ttl_cache(seconds: int):
+    """Caches a function's results per argument tuple for `seconds`."""
+    def decorator(fn):
+        cache, lock = {}, threading.Lock()
+
+        @wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(args)
+                if hit and hit[0] > now:
+                    return hit[1]
+            value = fn(*args)
+            with lock:
+                cache[args] = (now + seconds, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def _check_query(query: str) -> str:
+    """Returns the query without its trailing semicolon if it is a single SELECT/WITH statement."""
+    query = query.strip().rstrip(";").strip()
+    if not READ_ONLY_START.match(query) or ";" in query:
+        raise ValueError("Only a single SELECT (or WITH ... SELECT) statement is allowed.")
+    return query
+
+
+def _records(columns: list[str], rows: list) -> list[dict]:
+    """Converts DB rows to JSON-safe records (timestamps as ISO strings)."""
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _fetch_page(query: str, offset: int, page_size: int) -> dict:
+    """Runs the query with LIMIT/OFFSET pushed into the database and streams one page of rows."""
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    bounded = f"SELECT * FROM ({_check_query(query)}) AS q LIMIT :page_limit OFFSET :page_offset"
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(
+            text(bounded), {"page_limit": page_size + 1, "page_offset": offset}
+        )
+        columns = list(result.keys())
+        rows = result.fetchmany(page_size + 1)
+    has_more = len(rows) > page_size
+    return {
+        "columns": columns,
+        "rows": _records(columns, rows[:page_size]),
+        "offset": offset,
+        "has_more": has_more,
+        "next_offset": offset + page_size if has_more else None,
+    }
+
+
+@ttl_cache(CACHE_TTL_SECONDS)
+def _describe_schema() -> dict:
+    columns_query = """
+    SELECT table_name, column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name LIKE 'argo%'
+    ORDER BY table_name, ordinal_position
+    """
+    # reltuples is the planner's row estimate: free to read, unlike COUNT(*).
+    rows_query = "SELECT relname, reltuples::bigint AS estimated_rows FROM pg_class WHERE relkind = 'r' AND relname LIKE 'argo%'"
+    with engine.connect() as connection:
+        columns_df = pd.read_sql(text(columns_query), connection)
+        rows_df = pd.read_sql(text(rows_query), connection)
+    estimated = dict(zip(rows_df["relname"], rows_df["estimated_rows"].astype(int)))
+    return {
+        table: {
+            "columns": [{"name": r["column_name"], "type": r["data_type"]} for _, r in group.iterrows()],
+            "estimated_rows": estimated.get(table),
+        }
+        for table, group in columns_df.groupby("table_name")
+    }
+
+
+@ttl_cache(CACHE_TTL_SECONDS)
+def _float_summary(platform_number: str | None, limit: int) -> dict:
+    summary_query = """
+    SELECT
+        platform_number,
+        COUNT(DISTINCT cycle_number) AS total_cycles,
+        MIN(juld) AS first_seen,
+        MAX(juld) AS last_seen,
+        MIN(latitude) AS min_lat,
+        MAX(latitude) AS max_lat,
+        MIN(longitude) AS min_lon,
+        MAX(longitude) AS max_lon
+    FROM argo_data
+    WHERE (CAST(:platform_number AS TEXT) IS NULL OR platform_number = :platform_number)
+    GROUP BY platform_number
+    ORDER BY platform_number
+    LIMIT :limit
+    """
+    with engine.connect() as connection:
+        result = connection.execute(text(summary_query), {"platform_number": platform_number, "limit": limit})
+        columns = list(result.keys())
+        return {"floats": _records(columns, result.fetchall())}
+
+
+@ttl_cache(CACHE_TTL_SECONDS)
+def _sample_rows(n: int) -> dict:
+    with engine.connect() as connection:
+        # Block sampling reads a fraction of pages instead of scanning the table.
+        result = connection.execute(text("SELECT * FROM argo_data TABLESAMPLE SYSTEM (1) LIMIT :n"), {"n": n})
+        rows = result.fetchall()
+        if len(rows) < n:
+            result = connection.execute(text("SELECT * FROM argo_data LIMIT :n"), {"n": n})
+            rows = result.fetchall()
+        return {"rows": _records(list(result.keys()), rows)}
+
+
+async def _in_thread(fn, *args) -> dict:
+    """Runs blocking DB work off the event loop so concurrent tool calls don't serialize."""
     try:
-        df = pd.read_sql(text(query), engine.connect())
-        return {"rows": df.head(100).to_dict(orient="records")}
+        return await anyio.to_thread.run_sync(fn, *args)
     except Exception as e:
         return {"error": str(e)}
 
+
+@mcp.tool()
+async def run_sql(query: str, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """Execute a read-only SQL query on argo_data and return up to `limit` rows (max 1000)."""
+    return await _in_thread(_fetch_page, query, 0, limit)
+
+
+@mcp.tool()
+async def run_sql_page(query: str, offset: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """Fetch one page of a read-only SQL query. Pass `next_offset` from the previous page to continue."""
+    return await _in_thread(_fetch_page, query, offset, page_size)
+
+
+@mcp.tool()
+async def describe_schema() -> dict:
+    """Describe the argo tables: columns, types and estimated row counts. Cached."""
+    return await _in_thread(_describe_schema)
+
+
+@mcp.tool()
+async def float_summary(platform_number: str | None = None, limit: int = 50) -> dict:
+    """Per-float summary (cycles, active dates, lat/lon extent), optionally for one platform_number. Cached."""
+    return await _in_thread(_float_summary, platform_number, max(1, min(limit, MAX_PAGE_SIZE)))
+
+
+@mcp.tool()
+async def sample_rows(n: int = 10) -> dict:
+    """A small sample of argo_data rows to see what the data looks like. Cached."""
+    return await _in_thread(_sample_rows, max(1, min(n, DEFAULT_PAGE_SIZE)))
+
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
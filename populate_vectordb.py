@@ -1,11 +1,14 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 import chromadb
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import os
+import sys
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from float_documents import format_float_document, load_float_summaries
+
 print("--- Starting Vector Database Population Process ---")
 
 # --- 1. Load Configuration ---
@@ -21,26 +24,7 @@ print("Connecting to PostgreSQL to fetch float summary data...")
 try:
     engine_string = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     engine = create_engine(engine_string)
-    
-    # Query to get a summary for each unique float
-    summary_query = """
-    SELECT 
-        platform_number,
-        COUNT(DISTINCT cycle_number) as total_cycles,
-        MIN(juld)::date as first_seen,
-        MAX(juld)::date as last_seen,
-        MIN(latitude) as min_lat,
-        MAX(latitude) as max_lat,
-        MIN(longitude) as min_lon,
-        MAX(longitude) as max_lon
-    FROM 
-        argo_data
-    GROUP BY 
-        platform_number
-    ORDER BY
-        platform_number;
-    """
-    floats_df = pd.read_sql(text(summary_query), engine.connect())
+    floats_df = load_float_summaries(engine)
     print(f"Successfully fetched summary data for {len(floats_df)} unique floats.")
 
 except Exception as e:
@@ -54,13 +38,7 @@ metadatas = []
 ids = []
 
 for _, row in tqdm(floats_df.iterrows(), total=floats_df.shape[0], desc="Processing floats"):
-    # Create a simple, descriptive sentence for each float
-    doc = (
-        f"ARGO float with platform number {row['platform_number']} was active from {row['first_seen']} to {row['last_seen']}. "
-        f"It recorded {row['total_cycles']} cycles. "
-        f"Its operational area was between latitudes {row['min_lat']:.2f} and {row['max_lat']:.2f}, and longitudes {row['min_lon']:.2f} and {row['max_lon']:.2f}."
-    )
-    documents.append(doc)
+    documents.append(format_float_document(row))
     # Store the platform number in the metadata for easy retrieval
     metadatas.append({"platform_number": str(row['platform_number'])})
     # Use the platform number as the unique ID for each entry
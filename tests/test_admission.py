@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from admission import Saturated, StageLimiter, limiter_from_env
+
+
+def hold_slots(limiter, count):
+    """Occupies `count` slots from background threads until the returned event is set."""
+    release, held = threading.Event(), threading.Semaphore(0)
+
+    def worker():
+        with limiter.slot():
+            held.release()
+            release.wait(5)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for _ in range(count):
+        assert held.acquire(timeout=5)
+    return release, threads
+
+
+def queue_one(limiter):
+    """Starts a thread that waits in the queue for a slot, then releases it; returns once it is queued."""
+    thread = threading.Thread(target=lambda: (limiter.acquire(), limiter.release()))
+    thread.start()
+    while limiter.stats()["queued"] < 1:
+        time.sleep(0.005)
+    return thread
+
+
+def test_full_queue_is_rejected_with_429():
+    limiter = StageLimiter("db", concurrency=1, max_queue=1, max_wait_seconds=5)
+    release, threads = hold_slots(limiter, 1)
+    queued = queue_one(limiter)
+    with pytest.raises(Saturated) as excinfo:
+        limiter.acquire()
+    assert excinfo.value.status_code == 429 and excinfo.value.stage == "db"
+    release.set()
+    for thread in threads + [queued]:
+        thread.join(5)
+    assert (limiter.stats()["rejected"], limiter.stats()["active"]) == (1, 0)
+
+
+def test_wait_past_deadline_is_rejected_with_503():
+    limiter = StageLimiter("llm", concurrency=1, max_queue=4, max_wait_seconds=0.05)
+    release, threads = hold_slots(limiter, 1)
+    started = time.monotonic()
+    with pytest.raises(Saturated) as excinfo:
+        limiter.acquire()
+    assert excinfo.value.status_code == 503 and excinfo.value.retry_after == 1
+    assert time.monotonic() - started >= 0.05
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert limiter.stats()["timed_out"] == 1
+
+
+def test_waiter_gets_slot_when_one_is_released():
+    limiter = StageLimiter("request", concurrency=1, max_queue=1, max_wait_seconds=5)
+    release, threads = hold_slots(limiter, 1)
+    threading.Timer(0.05, release.set).start()
+    with limiter.slot():
+        assert limiter.stats()["active"] == 1
+    for thread in threads:
+        thread.join(5)
+
+
+def test_stats_counts_active_and_queued():
+    limiter = StageLimiter("embedding", concurrency=2, max_queue=3, max_wait_seconds=5)
+    release, threads = hold_slots(limiter, 2)
+    queued = queue_one(limiter)
+    stats = limiter.stats()
+    assert (stats["active"], stats["queued"], stats["concurrency"], stats["max_queue"]) == (2, 1, 2, 3)
+    release.set()
+    for thread in threads + [queued]:
+        thread.join(5)
+    assert (limiter.stats()["active"], limiter.stats()["queued"]) == (0, 0)
+
+
+def test_limiter_from_env_overrides(monkeypatch):
+    monkeypatch.setenv("ADMISSION_DB_CONCURRENCY", "3")
+    monkeypatch.setenv("ADMISSION_DB_WAIT_SECONDS", "0.5")
+    limiter = limiter_from_env("db", concurrency=8, max_queue=32, max_wait_seconds=10)
+    assert (limiter.concurrency, limiter.max_queue, limiter.max_wait_seconds) == (3, 32, 0.5)
@@ -0,0 +1,22 @@
+import os
+
+from cache import NullCache, SQLiteCache, cache_from_url
+
+
+def test_sqlite_cache_round_trip_in_private_dir(tmp_path):
+    os.chmod(tmp_path, 0o700)
+    cache = cache_from_url(f"sqlite:///{tmp_path / 'cache.sqlite3'}")
+    assert isinstance(cache, SQLiteCache)
+    cache.set("key", {"rows": 3}, ttl=60)
+    assert cache.get("key") == {"rows": 3}
+    assert os.stat(cache.path).st_mode & 0o777 == 0o600
+
+
+def test_shared_directory_is_refused(tmp_path):
+    os.chmod(tmp_path, 0o777)
+    assert isinstance(cache_from_url(f"sqlite:///{tmp_path / 'cache.sqlite3'}"), NullCache)
+
+
+def test_unusable_url_falls_back_to_null_cache():
+    assert isinstance(cache_from_url("sqlite:///missing-dir/cache.sqlite3"), NullCache)
+    assert isinstance(cache_from_url("memcached://localhost"), NullCache)
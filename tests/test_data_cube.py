@@ -0,0 +1,59 @@
+import pytest
+
+from data_cube import cube_sql, route_to_cube
+
+
+@pytest.mark.parametrize("where, expected", [
+    ("latitude >= 10 AND latitude < 20", "lat_lo >= 10.0 AND lat_hi <= 20.0"),
+    ("pressure >= 100 AND pressure < 500", "pres_lo >= 100.0 AND pres_hi <= 500.0"),
+])
+def test_half_open_edge_bounds_route_to_cube(where, expected):
+    cube_query = route_to_cube(f"SELECT AVG(temperature) FROM argo_data WHERE {where}")
+    assert cube_query is not None and cube_query.endswith(expected)
+
+
+@pytest.mark.parametrize("where", [
+    "pressure >= 500 AND pressure <= 500",
+    "latitude BETWEEN -5 AND 5",
+    "latitude > 10",
+    "longitude <= 60",
+    "latitude >= 10.5",
+    "pressure >= 120",
+    "pressure >= 0",
+    "pressure < 10000",
+])
+def test_bounds_that_are_not_exact_fall_back_to_raw_data(where):
+    assert route_to_cube(f"SELECT AVG(temperature) FROM argo_data WHERE {where}") is None
+
+
+def test_grouped_by_month_with_region():
+    sql = ("SELECT EXTRACT(MONTH FROM juld) AS month, COUNT(salinity) FROM argo_data "
+           "WHERE cell_id IN (SELECT cell_id FROM argo_region_cells WHERE region = 'arabian_sea') "
+           "GROUP BY month ORDER BY month")
+    cube_query = route_to_cube(sql)
+    assert "FROM argo_cube" in cube_query
+    assert "GROUP BY EXTRACT(MONTH FROM month)" in cube_query
+    assert "region = 'arabian_sea'" in cube_query
+
+
+def test_non_aggregate_queries_are_not_routed():
+    assert route_to_cube("SELECT temperature FROM argo_data WHERE latitude >= 10") is None
+
+
+def test_cube_keeps_rows_with_null_dimensions():
+    # Unfiltered and lat/lon-only aggregates route to the cube, so it must not
+    # drop measurements whose position, pressure or juld is NULL.
+    sql = cube_sql()
+    for column in ("latitude", "longitude", "pressure", "juld"):
+        assert f"{column} IS NOT NULL AND" not in sql and f"AND {column} IS NOT NULL" not in sql
+    assert "WHERE v.value IS NOT NULL\n" in sql
+    assert "CASE WHEN pressure IS NOT NULL" in sql
+    assert "depth_bin BETWEEN" not in sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT AVG(temperature) FROM argo_data",
+    "SELECT COUNT(salinity) FROM argo_data WHERE latitude >= 10",
+])
+def test_queries_not_constraining_every_dimension_still_route(sql):
+    assert route_to_cube(sql) is not None
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from downsample import downsample_frame, thin_points
+
+MAX_ROWS = 100
+
+
+def profile(rows=800):
+    pressure = np.linspace(5, 2000, rows)
+    return pd.DataFrame({
+        "latitude": 12.5, "longitude": 65.25, "pressure": pressure,
+        "temperature": 28 * np.exp(-pressure / 400) + 2, "salinity": 35 + np.sin(pressure / 200),
+    })
+
+
+def test_constant_position_profile_keeps_its_shape():
+    df = profile()
+    out = downsample_frame(df, MAX_ROWS)
+    assert 0.9 * MAX_ROWS <= len(out) <= MAX_ROWS
+    # Spread over the whole depth range, not collapsed to one grid cell.
+    assert out["pressure"].min() == 5 and out["pressure"].max() == 2000
+    assert np.diff(np.sort(out["pressure"])).max() < 200
+
+
+def test_lat_lon_scatter_is_grid_thinned_to_the_budget():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"latitude": rng.uniform(-30, 30, 5000), "longitude": rng.uniform(40, 100, 5000),
+                       "temperature": rng.normal(20, 3, 5000)})
+    out = downsample_frame(df, MAX_ROWS)
+    assert 0.9 * MAX_ROWS <= len(out) <= MAX_ROWS
+    assert out["latitude"].max() - out["latitude"].min() > 50
+
+
+def test_thin_points_fills_budget_when_points_share_cells():
+    lat = np.repeat(np.arange(10.0), 100)
+    lon = np.repeat(np.arange(10.0), 100)
+    assert len(thin_points(lat, lon, 50)) == 50
+
+
+def test_juld_series_with_nat_skips_missing_dates():
+    juld = pd.Series(pd.date_range("2020-01-01", periods=1000, freq="D"))
+    juld[::10] = pd.NaT
+    df = pd.DataFrame({"juld": juld, "temperature": np.sin(np.arange(1000) / 50)})
+    out = downsample_frame(df, MAX_ROWS)
+    assert len(out) <= MAX_ROWS
+    dated = out["juld"].dropna()
+    assert dated.min() <= pd.Timestamp("2020-01-03") and dated.max() >= pd.Timestamp("2022-09-20")
+
+
+def test_extremes_of_every_numeric_column_are_kept():
+    df = profile()
+    df.loc[417, "salinity"] = 40.0
+    df.loc[123, "temperature"] = -1.5
+    out = downsample_frame(df, MAX_ROWS)
+    assert {123, 417} <= set(out.index)
+    for column in ("pressure", "temperature", "salinity"):
+        assert out[column].min() == df[column].min() and out[column].max() == df[column].max()
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueueFull, JobRunner, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    os.chmod(tmp_path, 0o700)
+    return JobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60)
+
+
+def wait_for(store, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {store.get(job_id)}")
+
+
+def test_successful_job_records_sub_answers_and_result(store):
+    def pipeline(question, on_sub_answer):
+        on_sub_answer({"part": 1})
+        on_sub_answer({"part": 2})
+        return {"answer": question.upper()}
+
+    runner = JobRunner(store, workers=1, max_pending=2)
+    job = wait_for(store, runner.submit("q", pipeline), "succeeded")
+    assert job["sub_answers"] == [{"part": 1}, {"part": 2}]
+    assert job["result"] == {"answer": "Q"}
+    assert runner.pending() == 0
+
+
+def test_failing_pipeline_marks_job_failed(store):
+    def pipeline(question, on_sub_answer):
+        on_sub_answer({"part": 1})
+        raise RuntimeError("database down")
+
+    runner = JobRunner(store, workers=1, max_pending=2)
+    job = wait_for(store, runner.submit("q", pipeline), "failed")
+    assert job["error"] == "database down" and job["sub_answers"] == [{"part": 1}]
+
+
+def test_pending_limit_rejects_extra_jobs(store):
+    release = threading.Event()
+    runner = JobRunner(store, workers=1, max_pending=2)
+    first = runner.submit("a", lambda q, cb: release.wait(5) and {})
+    runner.submit("b", lambda q, cb: {})
+    assert runner.pending() == 2
+    with pytest.raises(JobQueueFull):
+        runner.submit("c", lambda q, cb: {})
+    release.set()
+    wait_for(store, first, "succeeded")
+
+
+def test_expired_jobs_are_not_returned(tmp_path):
+    os.chmod(tmp_path, 0o700)
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=-1)
+    assert store.get(store.create("q")) is None
+
+
+def test_shared_directory_is_refused(tmp_path):
+    os.chmod(tmp_path, 0o777)
+    with pytest.raises(PermissionError):
+        JobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60)
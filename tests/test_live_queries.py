@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from live_queries import LiveQuery, LiveQueryStore, delta_sql, merge_result, plan_live_query
+
+
+def live_query(sql, result):
+    live = LiveQuery("id", "question", sql, *plan_live_query(sql))
+    live.result = result
+    return live
+
+
+def test_group_by_without_aggregates_unions_new_groups():
+    sql = "SELECT platform_number FROM argo_data GROUP BY platform_number ORDER BY platform_number"
+    live = live_query(sql, pd.DataFrame({"platform_number": ["a", "b"]}))
+    assert live.mode == "distinct"
+    merged = merge_result(live, pd.DataFrame({"platform_number": ["c", "b"]}))
+    assert merged["platform_number"].tolist() == ["a", "b", "c"]
+
+
+def test_grouped_aggregates_are_combined():
+    sql = "SELECT platform_number, COUNT(*) AS n, MAX(temperature) AS t FROM argo_data GROUP BY platform_number"
+    live = live_query(sql, pd.DataFrame({"platform_number": ["a"], "n": [2], "t": [10.0]}))
+    delta = pd.DataFrame({"platform_number": ["a", "b"], "n": [3, 1], "t": [12.0, 5.0]})
+    merged = merge_result(live, delta).set_index("platform_number")
+    assert merged.loc["a", "n"] == 5 and merged.loc["a", "t"] == 12.0 and merged.loc["b", "n"] == 1
+
+
+def test_delta_sql_keeps_clauses_after_line_comment():
+    sql = "SELECT * FROM argo_data -- recent rows\nWHERE platform_number = '2902746';"
+    rewritten = delta_sql(sql, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert "--" not in rewritten
+    assert "juld > '2024-01-01T00:00:00'::timestamp" in rewritten
+    assert rewritten.rstrip().endswith("WHERE platform_number = '2902746'")
+
+
+def test_group_by_must_match_selected_columns():
+    sql = "SELECT platform_number, MAX(temperature) AS t FROM argo_data GROUP BY platform_number, cycle_number"
+    assert plan_live_query(sql)[0] == "full"
+    sql = "SELECT EXTRACT(YEAR FROM juld) AS yr, COUNT(*) AS n FROM argo_data GROUP BY yr"
+    assert plan_live_query(sql)[:2] == ("reaggregate", ["yr"])
+
+
+def test_positional_order_by_falls_back_to_full():
+    sql = "SELECT platform_number, MAX(temperature) AS t FROM argo_data GROUP BY platform_number ORDER BY 2 DESC"
+    assert plan_live_query(sql)[0] == "full"
+
+
+def test_store_persists_queries_across_instances(tmp_path):
+    os.chmod(tmp_path, 0o700)
+    path = str(tmp_path / "live.sqlite3")
+    store = LiveQueryStore(path, ttl_seconds=60)
+    live = store.create("question", "SELECT COUNT(*) AS n FROM argo_data")
+    live.result = pd.DataFrame({"n": [3]})
+    store.save(live)
+    loaded = LiveQueryStore(path, ttl_seconds=60).get(live.id)
+    assert loaded.mode == "reaggregate" and loaded.result["n"].tolist() == [3]
+    assert store.get("missing") is None
+
+
+def test_expired_queries_are_not_returned(tmp_path):
+    os.chmod(tmp_path, 0o700)
+    store = LiveQueryStore(str(tmp_path / "live.sqlite3"), ttl_seconds=-1)
+    live = store.create("question", "SELECT * FROM argo_data")
+    store.save(live)
+    assert store.get(live.id) is None
@@ -0,0 +1,38 @@
+import datetime as dt
+
+import pandas as pd
+
+from retrieval import HybridRetriever
+
+
+def summaries(n):
+    return pd.DataFrame({
+        "platform_number": [str(2900000 + i) for i in range(n)],
+        "total_cycles": list(range(10, 10 + n)),
+        "first_seen": [dt.date(2023, 1, 1)] * n,
+        "last_seen": [dt.date(2023, 12, 31)] * n,
+        "min_lat": [0.0] * n, "max_lat": [1.0] * n, "min_lon": [60.0] * n, "max_lon": [61.0] * n,
+    })
+
+
+def test_exact_platform_lookup():
+    docs = HybridRetriever(summaries(5)).search("What did float 2900002 measure?")
+    assert len(docs) == 1 and "2900002" in docs[0]
+
+
+def test_many_keyword_matches_are_summarized_not_sampled():
+    docs = HybridRetriever(summaries(5)).search("average temperature in 2023", k=3)
+    assert len(docs) == 1
+    assert docs[0].startswith("5 ARGO floats match 2023") and "2900000" not in docs[0]
+
+
+def test_few_keyword_matches_are_ranked_by_cycles():
+    docs = HybridRetriever(summaries(2)).search("average temperature in 2023", k=3)
+    assert ["2900001" in docs[0], "2900000" in docs[1]] == [True, True]
+
+
+def test_float_without_dates_is_indexed_without_years():
+    rows = summaries(2)
+    rows.loc[0, ["first_seen", "last_seen"]] = None
+    retriever = HybridRetriever(rows)
+    assert retriever.keyword_matches("in 2023") == ["2900001"]
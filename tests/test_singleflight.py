@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+WAITERS = 5
+
+
+def run_concurrently(flight, key, fn):
+    """Starts a leader blocked inside `fn`, lets WAITERS callers join it, then returns their futures."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return fn()
+
+    pool = ThreadPoolExecutor(max_workers=WAITERS + 1)
+    futures = [pool.submit(flight.do, key, leader_fn)]
+    assert started.wait(5)
+    futures += [pool.submit(flight.do, key, leader_fn) for _ in range(WAITERS)]
+    time.sleep(0.1)  # Let the waiters block on the in-flight call
+    assert flight.in_flight() == 1
+    release.set()
+    pool.shutdown(wait=True)
+    return futures, calls
+
+
+def test_waiters_receive_the_leaders_result():
+    flight = SingleFlight("test")
+    result = {"rows": 3}
+    futures, calls = run_concurrently(flight, "q", lambda: result)
+    assert len(calls) == 1
+    assert all(f.result() is result for f in futures)
+
+
+def test_waiters_receive_the_leaders_exception():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise RuntimeError("query failed")
+
+    futures, calls = run_concurrently(flight, "q", fail)
+    assert len(calls) == 1
+    for future in futures:
+        with pytest.raises(RuntimeError, match="query failed"):
+            future.result()
+
+
+def test_key_is_released_after_completion():
+    flight = SingleFlight("test")
+    assert flight.do("q", lambda: 1) == 1
+    assert flight.in_flight() == 0
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("q", fail)
+    assert flight.in_flight() == 0
+    # Nothing is cached: the next call runs again.
+    assert flight.do("q", lambda: 2) == 2
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight("test")
+    assert [flight.do(k, lambda k=k: k.upper()) for k in ("a", "b")] == ["A", "B"]
@@ -0,0 +1,51 @@
+import pytest
+
+from sql_guard import InvalidSQL, canonical_key, check_sql
+
+SCHEMA = {"argo_data": {"platform_number", "cycle_number", "juld", "temperature", "Temp"}}
+
+
+def test_line_comment_does_not_swallow_rest_of_query():
+    checked = check_sql("SELECT * FROM argo_data -- rows\nWHERE platform_number = '2902746'", SCHEMA)
+    assert checked.sql == "SELECT * FROM argo_data -- rows\nWHERE platform_number = '2902746'"
+    assert "WHERE platform_number" in checked.canonical
+    assert checked.params == ("'2902746'",)
+
+
+def test_trailing_semicolon_is_stripped():
+    assert check_sql("SELECT temperature FROM argo_data;\n", SCHEMA).sql == "SELECT temperature FROM argo_data"
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT pg_terminate_backend(123)",
+    "SELECT set_config('statement_timeout', '0', false)",
+    "SELECT pg_sleep(10)",
+    "SELECT * FROM argo_data FOR UPDATE",
+    "SELECT * INTO copy FROM argo_data",
+    "DELETE FROM argo_data",
+    "SELECT 1; SELECT 2",
+])
+def test_rejects_unsafe_statements(sql):
+    with pytest.raises(InvalidSQL):
+        check_sql(sql, SCHEMA)
+
+
+def test_rejects_unknown_columns():
+    with pytest.raises(InvalidSQL, match="salinityy"):
+        check_sql("SELECT salinityy FROM argo_data", SCHEMA)
+
+
+def test_canonical_key_ignores_cosmetic_differences():
+    a = canonical_key("select temperature from argo_data where cycle_number = 1 and platform_number = 'x'")
+    b = canonical_key("SELECT Temperature\nFROM argo_data WHERE platform_number = 'x' AND cycle_number = 1;")
+    assert a == b
+
+
+def test_canonical_key_keeps_quoted_identifier_case():
+    assert canonical_key('SELECT "Temp" FROM argo_data') != canonical_key("SELECT temp FROM argo_data")
+
+
+def test_canonical_key_keeps_literal_types():
+    assert canonical_key("SELECT 1/2") != canonical_key("SELECT 1.0/2")
+    assert canonical_key("SELECT COUNT(*)/7 FROM argo_data") != canonical_key("SELECT COUNT(*)/7.0 FROM argo_data")
+    assert canonical_key("SELECT 1") != canonical_key("SELECT '1'")
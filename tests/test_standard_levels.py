@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from standard_levels import interpolate_profiles
+
+
+def measurements(profiles):
+    """Rows for {(platform, cycle): [(pressure, temperature), ...]}."""
+    rows = [
+        {"platform_number": platform, "cycle_number": cycle, "pressure": pressure,
+         "temperature": temperature, "salinity": 35.0}
+        for (platform, cycle), samples in profiles.items()
+        for pressure, temperature in samples
+    ]
+    return pd.DataFrame(rows)
+
+
+def level(result, platform, cycle, pressure_level):
+    row = result[(result["platform_number"] == platform) & (result["cycle_number"] == cycle)
+                 & (result["pressure_level"] == pressure_level)]
+    return row["temperature"].iloc[0] if len(row) else None
+
+
+def test_exact_level_uses_measured_value():
+    result = interpolate_profiles(measurements({("a", 1): [(10.0, 25.0), (20.0, 24.0)]}))
+    assert level(result, "a", 1, 10) == 25.0 and level(result, "a", 1, 20) == 24.0
+
+
+def test_linear_interpolation_between_samples():
+    result = interpolate_profiles(measurements({("a", 1): [(0.0, 30.0), (100.0, 20.0)]}))
+    assert np.isclose(level(result, "a", 1, 30), 27.0)
+    assert np.isclose(level(result, "a", 1, 75), 22.5)
+
+
+def test_gap_wider_than_max_is_not_interpolated():
+    result = interpolate_profiles(measurements({("a", 1): [(100.0, 20.0), (500.0, 10.0)]}))
+    assert level(result, "a", 1, 100) == 20.0 and level(result, "a", 1, 500) == 10.0
+    assert level(result, "a", 1, 300) is None
+
+
+def test_levels_outside_sampled_range_are_left_out():
+    result = interpolate_profiles(measurements({("a", 1): [(50.0, 20.0), (200.0, 15.0)]}))
+    assert level(result, "a", 1, 5) is None and level(result, "a", 1, 30) is None
+    assert level(result, "a", 1, 250) is None
+    assert level(result, "a", 1, 50) == 20.0
+
+
+def test_nan_values_are_skipped():
+    result = interpolate_profiles(measurements({("a", 1): [(0.0, 30.0), (50.0, np.nan), (100.0, 20.0)]}))
+    assert np.isclose(level(result, "a", 1, 50), 25.0)
+
+
+def test_multi_profile_batch_does_not_mix_profiles():
+    # The second profile starts deeper than the first ends; interpolation must not bridge them.
+    profiles = {("a", 1): [(0.0, 30.0), (20.0, 28.0)], ("a", 2): [(30.0, 10.0), (50.0, 8.0)],
+                ("b", 1): [(0.0, 5.0), (50.0, 0.0)]}
+    result = interpolate_profiles(measurements(profiles))
+    assert np.isclose(level(result, "a", 1, 10), 29.0) and level(result, "a", 1, 30) is None
+    assert level(result, "a", 2, 20) is None and level(result, "a", 2, 30) == 10.0
+    assert np.isclose(level(result, "b", 1, 20), 3.0)
+
+
+def test_profiles_across_batch_boundary(monkeypatch):
+    monkeypatch.setattr("standard_levels.BATCH_PROFILES", 2)
+    profiles = {("p", cycle): [(0.0, float(cycle)), (100.0, cycle + 10.0)] for cycle in range(5)}
+    result = interpolate_profiles(measurements(profiles))
+    for cycle in range(5):
+        assert np.isclose(level(result, "p", cycle, 50), cycle + 5.0)
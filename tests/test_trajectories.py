@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from trajectories import (TRAJECTORIES_TABLE, fetch_trajectories_in_bbox, fetch_trajectory, longitude_extent,
+                          profile_positions, resolve_zoom, simplified_tracks, simplify)
+
+
+def test_simplify_keeps_endpoints_and_drops_collinear_points():
+    lat = np.array([0.0, 0.0, 0.0, 1.0, 0.0])
+    lon = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    assert simplify(lat, lon, 0.7).tolist() == [0, 3, 4]
+    assert simplify(lat, lon, 0.0).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_resolve_zoom_picks_nearest_lower_level():
+    assert [resolve_zoom(z) for z in (0, 3, 8, 15)] == [2, 2, 8, 8]
+
+
+def tracks_engine():
+    rows = [("east", c, 10.0, 170.0 + c) for c in range(3)] + [("west", c, 10.0, -170.0 - c) for c in range(3)]
+    rows += [("atlantic", c, 10.0, -30.0 + c) for c in range(3)]
+    rows += [("dateline", c, 10.0, lon) for c, lon in enumerate([178.0, 179.5, -179.5, -178.0])]
+    df = pd.DataFrame(rows, columns=["platform_number", "cycle_number", "latitude", "longitude"])
+    df["juld"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(df["cycle_number"] * 10, unit="D")
+    engine = create_engine("sqlite://")
+    simplified_tracks(profile_positions(df)).to_sql(TRAJECTORIES_TABLE, engine, index=False)
+    return engine
+
+
+def test_fetch_full_detail_track():
+    track = fetch_trajectory(tracks_engine(), "east", 8)
+    assert track["cycles"] == [0, 1, 2]
+    assert track["coordinates"][0] == [10.0, 170.0]
+    assert fetch_trajectory(tracks_engine(), "missing", 8) is None
+
+
+def test_bbox_crossing_antimeridian_matches_both_sides():
+    engine = tracks_engine()
+    platforms = [t["platform_number"] for t in fetch_trajectories_in_bbox(engine, (160.0, 0.0, -160.0, 20.0), 8, 10)]
+    assert platforms == ["dateline", "east", "west"]
+    platforms = [t["platform_number"] for t in fetch_trajectories_in_bbox(engine, (-40.0, 0.0, -20.0, 20.0), 8, 10)]
+    assert platforms == ["atlantic"]
+
+
+def test_track_crossing_antimeridian_has_wrapped_extent():
+    engine = tracks_engine()
+    assert fetch_trajectory(engine, "dateline", 8)["bbox"] == [178.0, 10.0, -178.0, 10.0]
+    # Only bboxes near the dateline match it, not everything in its latitude band.
+    in_atlantic = fetch_trajectories_in_bbox(engine, (-40.0, 0.0, -20.0, 20.0), 8, 10)
+    assert "dateline" not in [t["platform_number"] for t in in_atlantic]
+    east_side = fetch_trajectories_in_bbox(engine, (165.0, 0.0, 180.0, 20.0), 8, 10)
+    assert [t["platform_number"] for t in east_side] == ["dateline", "east"]
+    west_side = fetch_trajectories_in_bbox(engine, (-180.0, 0.0, -165.0, 20.0), 8, 10)
+    assert [t["platform_number"] for t in west_side] == ["dateline", "west"]
+
+
+def test_longitude_extent():
+    assert longitude_extent(np.array([10.0, 20.0, 15.0])) == (10.0, 20.0)
+    assert longitude_extent(np.array([178.0, -179.5, 179.5])) == (178.0, -179.5)